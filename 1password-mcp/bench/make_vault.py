@@ -0,0 +1,165 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = []
+# ///
+"""Generate a synthetic 1Password vault for the fake `op` CLI (bench/bin/op).
+
+Usage:
+    make_vault.py <out-dir> [--items 10000] [--urls 3] [--vaults 2]
+                  [--duplicates 0.05] [--seed 1]
+
+Writes three files into <out-dir>:
+    list.json     what `op item list --format json` prints (no fields)
+    items.jsonl   one full item (with fields) per line
+    offsets.json  {id: byte offset in items.jsonl} so `op item get` seeks
+
+`op item delete` records ids in deleted.txt, which regenerating removes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+SITES = [
+    "github",
+    "google",
+    "amazon",
+    "dropbox",
+    "atlassian",
+    "slack",
+    "notion",
+    "figma",
+    "stripe",
+    "netflix",
+    "spotify",
+    "linear",
+    "vercel",
+    "cloudflare",
+    "digitalocean",
+    "heroku",
+    "twitter",
+    "linkedin",
+    "reddit",
+    "gitlab",
+]
+SUFFIXES = ["com", "io", "org", "net", "co.uk", "com.au", "de", "fr", "dev", "app"]
+SUBDOMAINS = ["", "", "www", "app", "login", "accounts", "auth", "admin", "my", "id"]
+USERS = ["alice", "bob", "carol", "dave", "erin", "frank", "grace", "heidi"]
+MAIL = ["gmail.com", "corp.example", "proton.me", "outlook.com"]
+CATEGORIES = ["LOGIN"] * 17 + ["PASSWORD", "API_CREDENTIAL", "SECURE_NOTE"]
+
+
+def make_site(rng: random.Random, index: int) -> str:
+    # Few popular sites with many accounts, then a long tail of unique ones
+    if rng.random() < 0.3:
+        return rng.choice(SITES)
+    return f"site{rng.randrange(max(10, index // 4))}"
+
+
+def make_host(rng: random.Random, site: str) -> str:
+    host = f"{site}.{rng.choice(SUFFIXES)}"
+    sub = rng.choice(SUBDOMAINS)
+    return f"{sub}.{host}" if sub else host
+
+
+def make_item(rng: random.Random, index: int, vaults: list[dict], urls: int) -> dict:
+    site = make_site(rng, index)
+    # Extra URLs are mostly other hosts of the same site
+    hosts = [
+        make_host(rng, site if i == 0 or rng.random() < 0.7 else make_site(rng, index))
+        for i in range(rng.randint(1, max(1, urls)))
+    ]
+    username = f"{rng.choice(USERS)}{rng.randrange(100)}@{rng.choice(MAIL)}"
+    updated = datetime(2024, 1, 1, tzinfo=UTC) + timedelta(
+        seconds=rng.randrange(60 * 60 * 24 * 700)
+    )
+    category = rng.choice(CATEGORIES)
+    return {
+        "id": f"{index:08x}{rng.getrandbits(72):018x}"[:26],
+        "title": f"{site.title()} {index}",
+        "version": rng.randint(1, 9),
+        "vault": rng.choice(vaults),
+        "category": category,
+        "created_at": (updated - timedelta(days=rng.randrange(400))).isoformat(),
+        "updated_at": updated.isoformat(),
+        "additional_information": username if category == "LOGIN" else "",
+        "urls": [
+            {"primary": i == 0, "href": f"https://{host}/{'login' if i == 0 else ''}"}
+            for i, host in enumerate(hosts)
+        ],
+        "fields": [
+            {
+                "id": "username",
+                "type": "STRING",
+                "purpose": "USERNAME",
+                "label": "username",
+                "value": username,
+            },
+            {
+                "id": "password",
+                "type": "CONCEALED",
+                "purpose": "PASSWORD",
+                "label": "password",
+                "value": f"pw-{rng.getrandbits(64):016x}",
+            },
+            {"id": "notesPlain", "type": "STRING", "purpose": "NOTES", "value": ""},
+        ],
+    }
+
+
+def duplicate(rng: random.Random, item: dict, index: int) -> dict:
+    """Copy of an item (same username and URLs) saved at another time."""
+    copy = json.loads(json.dumps(item))
+    copy["id"] = f"{index:08x}{rng.getrandbits(72):018x}"[:26]
+    copy["title"] = f"{item['title']} (copy)"
+    copy["updated_at"] = (
+        datetime.fromisoformat(item["updated_at"])
+        + timedelta(seconds=rng.randrange(-(10**7), 10**7))
+    ).isoformat()
+    return copy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("out", type=Path, help="Output directory")
+    parser.add_argument("--items", type=int, default=10000, help="Item count")
+    parser.add_argument("--urls", type=int, default=3, help="Max URLs per item")
+    parser.add_argument("--vaults", type=int, default=2, help="Vault count")
+    parser.add_argument(
+        "--duplicates", type=float, default=0.05, help="Fraction of duplicated items"
+    )
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vaults = [
+        {"id": f"vault{i:02d}", "name": "Private" if i == 0 else f"Shared {i}"}
+        for i in range(args.vaults)
+    ]
+    items: list[dict] = []
+    for index in range(args.items):
+        if items and rng.random() < args.duplicates:
+            items.append(duplicate(rng, rng.choice(items), index))
+        else:
+            items.append(make_item(rng, index, vaults, args.urls))
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    offsets: dict[str, int] = {}
+    with (args.out / "items.jsonl").open("wb") as f:
+        for item in items:
+            offsets[item["id"]] = f.tell()
+            f.write(json.dumps(item).encode() + b"\n")
+    (args.out / "offsets.json").write_text(json.dumps(offsets))
+    listing = [{k: v for k, v in item.items() if k != "fields"} for item in items]
+    (args.out / "list.json").write_text(json.dumps(listing))
+    (args.out / "deleted.txt").unlink(missing_ok=True)
+    print(f"Wrote {len(items)} items to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = ["mcp"]
+# ///
+"""Benchmark the 1Password lookup paths against the fake `op` CLI.
+
+Usage:
+    run_bench.py [--sizes 1000,10000] [--latency 0.05] [--lookups 200]
+                 [--concurrency 4] [--scenarios find_items,find_credential,...]
+                 [--save results.json] [--baseline results.json]
+
+For each vault size a synthetic vault is generated (see make_vault.py), then
+every scenario runs in a fresh process so caches start cold and peak memory
+is its own:
+
+    find_items       DomainIndex lookups through find_items_by_url
+    find_credential  the find_credential tool handler, `concurrency` at a time
+    list_items       the list_items_for_url tool handler
+    script           skills/.../find_credential.py, one process per lookup
+    dedup            commands/dedup.py scan (answers "no" to the deletion)
+
+Reported per scenario: calls/sec, latency p50/p95, the first (cold) call,
+`op` invocations and peak RSS. --baseline prints the calls/sec change against
+a file written by --save.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH = Path(__file__).resolve().parent
+PLUGIN = BENCH.parent
+SCENARIOS = ("find_items", "find_credential", "list_items", "script", "dedup")
+
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    rss = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(samples: list[float], p: float) -> float | None:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[max(0, math.ceil(p * len(ordered)) - 1)], 3)
+
+
+def make_lookups(vault: Path, count: int, seed: int = 7) -> list[dict]:
+    """URL (+ username for half) lookups drawn from the vault, 10% misses."""
+    rng = random.Random(seed)
+    items = [i for i in json.loads((vault / "list.json").read_bytes()) if i["urls"]]
+    lookups = []
+    for n in range(count):
+        if rng.random() < 0.1:
+            lookups.append({"url": f"https://nomatch{n}.example/"})
+            continue
+        item = rng.choice(items)
+        lookup = {"url": rng.choice(item["urls"])["href"]}
+        if rng.random() < 0.5 and item["additional_information"]:
+            lookup["username"] = item["additional_information"]
+        lookups.append(lookup)
+    return lookups
+
+
+# Scenarios (run inside a worker process)
+
+
+async def timed_calls(lookups: list[dict], call, concurrency: int) -> dict:
+    latencies: list[float] = []
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(lookup: dict) -> None:
+        async with slots:
+            started = time.perf_counter()
+            await call(lookup)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    # The first call pays for `op item list` and indexing
+    started = time.perf_counter()
+    await call(lookups[0])
+    cold_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    await asyncio.gather(*(one(lookup) for lookup in lookups[1:]))
+    elapsed = time.perf_counter() - started
+    return {
+        "calls": len(latencies),
+        "seconds": round(elapsed, 3),
+        "cold_ms": round(cold_ms, 3),
+        "p50_ms": percentile(latencies, 0.5),
+        "p95_ms": percentile(latencies, 0.95),
+    }
+
+
+def in_process(scenario: str, lookups: list[dict], concurrency: int) -> dict:
+    sys.path.insert(0, str(PLUGIN))
+    import server
+
+    # Benchmarks must not overwrite the user's clipboard
+    async def no_clipboard(text: str) -> tuple[bool, str]:
+        return True, "Password copied to clipboard"
+
+    server.copy_to_clipboard = no_clipboard
+
+    if scenario == "find_items":
+        concurrency = 1
+
+        async def call(lookup: dict) -> None:
+            await server.find_items_by_url(lookup["url"])
+
+    elif scenario == "list_items":
+
+        async def call(lookup: dict) -> None:
+            await server.call_tool("list_items_for_url", {"url": lookup["url"]})
+
+    else:
+
+        async def call(lookup: dict) -> None:
+            await server.call_tool("find_credential", lookup)
+
+    result = asyncio.run(timed_calls(lookups, call, concurrency))
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def script(lookups: list[dict]) -> dict:
+    path = PLUGIN / "skills" / "credential-lookup" / "scripts" / "find_credential.py"
+    latencies = []
+    for lookup in lookups:
+        cmd = [sys.executable, str(path), lookup["url"]]
+        if lookup.get("username"):
+            cmd.append(lookup["username"])
+        started = time.perf_counter()
+        # Misses and ambiguous lookups exit non-zero too; only latency counts
+        subprocess.run(cmd, capture_output=True, check=False)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return {
+        "calls": len(latencies),
+        "seconds": round(sum(latencies) / 1000, 3),
+        "cold_ms": round(latencies[0], 3),
+        "p50_ms": percentile(latencies, 0.5),
+        "p95_ms": percentile(latencies, 0.95),
+        "peak_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+
+
+def dedup() -> dict:
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, str(PLUGIN / "commands" / "dedup.py")],
+        input="no\n",
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    elapsed = time.perf_counter() - started
+    return {
+        "calls": 1,
+        "seconds": round(elapsed, 3),
+        "cold_ms": round(elapsed * 1000, 3),
+        "p50_ms": None,
+        "p95_ms": None,
+        "peak_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+
+
+def worker(args: argparse.Namespace) -> None:
+    vault = Path(os.environ["OP_FAKE_VAULT"])
+    if args.worker == "dedup":
+        result = dedup()
+    elif args.worker == "script":
+        result = script(make_lookups(vault, args.script_lookups))
+    else:
+        lookups = make_lookups(vault, args.lookups + 1)
+        result = in_process(args.worker, lookups, args.concurrency)
+    print(json.dumps(result))
+
+
+# Driver
+
+
+def ensure_vault(workdir: Path, size: int) -> Path:
+    vault = workdir / f"vault-{size}"
+    if not (vault / "list.json").exists():
+        subprocess.run(
+            [sys.executable, str(BENCH / "make_vault.py"), str(vault)]
+            + ["--items", str(size)],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+    return vault
+
+
+def run_scenario(
+    scenario: str, vault: Path, workdir: Path, args: argparse.Namespace
+) -> dict:
+    log = workdir / f"op-{scenario}.log"
+    log.unlink(missing_ok=True)
+    cache = workdir / "cache" / scenario
+    shutil.rmtree(cache, ignore_errors=True)
+    env = {
+        **os.environ,
+        "PATH": f"{BENCH / 'bin'}{os.pathsep}{os.environ.get('PATH', '')}",
+        "OP_FAKE_VAULT": str(vault),
+        "OP_FAKE_LATENCY": str(args.latency),
+        "OP_FAKE_LOG": str(log),
+        # Keep a real broker, snapshot or trace out of the measurement, and the
+        # dedup checkpoint/journal and script metadata cache out of ~/.cache
+        "OP_BROKER_SOCKET": str(workdir / "no-broker.sock"),
+        "XDG_CACHE_HOME": str(cache),
+        "OP_MCP_SNAPSHOT": "0",
+        "OP_MCP_TRACE_FILE": "",
+    }
+    cmd = [sys.executable, str(Path(__file__).resolve()), "--worker", scenario]
+    cmd += ["--lookups", str(args.lookups), "--concurrency", str(args.concurrency)]
+    cmd += ["--script-lookups", str(args.script_lookups)]
+    proc = subprocess.run(cmd, env=env, capture_output=True, text=True, check=False)
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1:]}
+    result = json.loads(proc.stdout.splitlines()[-1])
+    op_calls = len(log.read_text().splitlines()) if log.exists() else 0
+    result["calls_per_sec"] = (
+        round(result["calls"] / result["seconds"], 1) if result["seconds"] else None
+    )
+    result["op_calls"] = op_calls
+    return result
+
+
+def print_table(results: dict, baseline: dict | None) -> None:
+    columns = [
+        ("calls", "calls"),
+        ("calls/s", "calls_per_sec"),
+        ("p50 ms", "p50_ms"),
+        ("p95 ms", "p95_ms"),
+        ("cold ms", "cold_ms"),
+        ("op calls", "op_calls"),
+        ("peak MB", "peak_rss_mb"),
+    ]
+    header = ["items", "scenario", *(c[0] for c in columns)]
+    if baseline:
+        header.append("vs baseline")
+    rows = []
+    for size, scenarios in results.items():
+        for scenario, result in scenarios.items():
+            if "error" in result:
+                rows.append([size, scenario, f"error: {result['error']}"])
+                continue
+            row = [size, scenario, *(result.get(key) for _, key in columns)]
+            before = (baseline or {}).get(size, {}).get(scenario, {})
+            if baseline and before.get("calls_per_sec") and result["calls_per_sec"]:
+                change = result["calls_per_sec"] / before["calls_per_sec"] - 1
+                row.append(f"{change:+.0%}")
+            rows.append(row)
+    cells = [[str("-" if v is None else v) for v in row] for row in [header, *rows]]
+    widths = [max(len(r[i]) for r in cells if i < len(r)) for i in range(len(header))]
+    for row in cells:
+        print("  ".join(cell.rjust(widths[i]) for i, cell in enumerate(row)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000", help="Vault sizes")
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="Seconds per op call"
+    )
+    parser.add_argument("--lookups", type=int, default=200, help="Calls per scenario")
+    parser.add_argument(
+        "--script-lookups", type=int, default=20, help="find_credential.py runs"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="Concurrent tool calls"
+    )
+    parser.add_argument(
+        "--dedup-max", type=int, default=1000, help="Largest vault to run dedup on"
+    )
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--workdir", type=Path, help="Where vaults are kept")
+    parser.add_argument("--save", type=Path, help="Write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="Compare with saved results")
+    parser.add_argument("--worker", choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    workdir = args.workdir or Path(tempfile.gettempdir()) / "op-bench"
+    workdir.mkdir(parents=True, exist_ok=True)
+    scenarios = [s for s in args.scenarios.split(",") if s in SCENARIOS]
+    results: dict[str, dict] = {}
+    for size in (int(s) for s in args.sizes.split(",")):
+        vault = ensure_vault(workdir, size)
+        results[str(size)] = {}
+        for scenario in scenarios:
+            if scenario == "dedup" and size > args.dedup_max:
+                continue
+            print(f"{size} items: {scenario}...", file=sys.stderr)
+            results[str(size)][scenario] = run_scenario(scenario, vault, workdir, args)
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    print_table(results, baseline)
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Client side of the local 1Password credential broker (`server.py --broker`).
+
+The broker owns one warm `op` session plus the listing, index and credential
+caches, and answers newline-delimited JSON requests on a Unix socket:
+
+    {"op": "ping"}
+    {"op": "list", "vault": null}                              -> {"ok", "items"}
+    {"op": "get", "item": "<id or name>", "vault": null}       -> {"ok", "item"}
+    {"op": "get", "item": "...", "password": false}            -> item without password
+    {"op": "find", "url": "...", "username": "", "vault": null} -> {"ok", "match", "candidates"}
+    {"op": "batch", "entries": [{"url": "...", "username": ""}]} -> {"ok", "results"}
+    {"op": "refresh", "vault": null}                           -> {"ok", "refreshed"}
+
+`find` answers `"candidates": null` when no item matches the URL, and a
+list (possibly empty) of credentials otherwise.
+
+Consumers call `request()` and fall back to running `op` directly when it
+returns None (no broker listening). Either way, credentials are read from item
+fields with `extract_credentials()`, the one rule shared by every consumer.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+from pathlib import Path
+
+
+def default_socket_path() -> Path:
+    """OP_BROKER_SOCKET, else a private directory under the runtime or cache dir."""
+    if path := os.environ.get("OP_BROKER_SOCKET"):
+        return Path(path).expanduser()
+    base = os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("XDG_CACHE_HOME")
+    return Path(base or Path.home() / ".cache") / "1password-mcp" / "broker.sock"
+
+
+SOCKET_PATH = default_socket_path()
+
+
+def request(payload: dict, timeout: float = 60) -> dict | None:
+    """Send one request to the broker. Returns None if no broker is running."""
+    if not SOCKET_PATH.exists():
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(SOCKET_PATH))
+            sock.sendall(json.dumps(payload).encode() + b"\n")
+            chunks = []
+            while not chunks or not chunks[-1].endswith(b"\n"):
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        return json.loads(b"".join(chunks))
+    except (OSError, ValueError):
+        return None
+
+
+def extract_credentials(item: dict) -> dict[str, str | None]:
+    """Username and password of an `op item get` item.
+
+    A field counts by purpose (USERNAME/PASSWORD), id or label, so Login items
+    and custom items such as app passwords are read the same way everywhere;
+    the first match wins.
+    """
+    username, password = None, None
+    for f in item.get("fields", []):
+        fid, purpose, val = f.get("id", ""), f.get("purpose", ""), f.get("value")
+        label = (f.get("label") or "").lower()
+        if purpose == "USERNAME" or "username" in (fid, label):
+            username = username or val
+        elif purpose == "PASSWORD" or "password" in (fid, label):
+            password = password or val
+    return {"username": username, "password": password}
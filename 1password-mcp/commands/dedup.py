@@ -3,12 +3,49 @@
 # requires-python = ">=3.11"
 # dependencies = []
 # ///
-"""1Password deduplication script - removes duplicate entries by username."""
+"""1Password deduplication script - removes duplicate login entries.
 
+Usage:
+    dedup.py [--group-by site] [--jobs 8] [--checkpoint PATH] [--fresh]
+             [--delete-rate 4] [--journal PATH] [--plan-out plan.json]
+    dedup.py --apply plan.json [--jobs 8] [--delete-rate 4] [--journal PATH]
+
+--plan-out writes the keep/delete plan and exits without deleting. --apply
+executes a saved plan without rescanning: one listing call confirms each
+planned item is unchanged since the plan was made.
+
+The examples in the docstrings run with `python -m doctest dedup.py`.
+"""
+
+import argparse
+import hashlib
 import json
+import os
+import random
 import subprocess
 import sys
+import threading
+import time
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+from functools import cache
+from pathlib import Path
+
+# Talk to the MCP server's credential broker when one is running
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from broker_client import extract_credentials
+from broker_client import request as broker_request
+from domains import normalize_domain, registrable_domain
+
+# Attempts per op call before giving up when 1Password keeps rate limiting
+MAX_ATTEMPTS = 6
+
+CACHE_DIR = (
+    Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "1password-mcp"
+)
+DEFAULT_CHECKPOINT = CACHE_DIR / "dedup-checkpoint.json"
+DEFAULT_JOURNAL = CACHE_DIR / "dedup-journal.ndjson"
 
 
 def run_op(args: list[str]) -> tuple[bool, str]:
@@ -28,9 +65,18 @@ def run_op(args: list[str]) -> tuple[bool, str]:
 
 def get_all_items() -> list[dict]:
     """Get all login items from 1Password."""
-    success, output = run_op(
-        ["item", "list", "--categories", "Login", "--format", "json"]
-    )
+    # Refresh first so the broker's listing reflects the vault right now
+    if broker_request({"op": "refresh"}) is not None:
+        response = broker_request({"op": "list"})
+        if response and response.get("ok"):
+            return [i for i in response["items"] if i.get("category") == "LOGIN"]
+    for attempt in range(MAX_ATTEMPTS):
+        success, output = run_op(
+            ["item", "list", "--categories", "Login", "--format", "json"]
+        )
+        if success or not is_rate_limited(output):
+            break
+        time.sleep(2**attempt * random.uniform(0.5, 1.0))
     if not success:
         print(f"Error listing items: {output}", file=sys.stderr)
         return []
@@ -41,41 +87,606 @@ def get_all_items() -> list[dict]:
         return []
 
 
-def get_item_details(item_id: str) -> dict | None:
-    """Get full item details by ID."""
+def get_item_details(item_id: str) -> tuple[dict | None, str | None]:
+    """Get full item details by ID. Returns (details, error)."""
     success, output = run_op(["item", "get", item_id, "--format", "json"])
     if not success:
-        return None
+        return None, output
     try:
-        return json.loads(output)
+        return json.loads(output), None
     except json.JSONDecodeError:
+        return None, "Failed to parse 1Password response"
+
+
+def get_login(
+    item_id: str, with_password: bool = False
+) -> tuple[str | None, str | None, str | None]:
+    """Username, and password if asked for, of an item (via the broker when running).
+
+    Returns (username, password, error). The broker is only asked for the
+    password when with_password is set.
+    """
+    response = broker_request({"op": "get", "item": item_id, "password": with_password})
+    if response is not None:
+        if not response.get("ok"):
+            return None, None, response.get("error", "Unknown error")
+        creds = response["item"]
+    else:
+        details, error = get_item_details(item_id)
+        if not details:
+            return None, None, error
+        creds = extract_credentials(details)
+    return creds.get("username"), creds.get("password") if with_password else None, None
+
+
+# Random per run: fingerprints only compare passwords within this process
+FINGERPRINT_KEY = os.urandom(32)
+
+
+def fingerprint(password: str | None) -> bytes | None:
+    """Keyed hash of a password, so the password itself can be dropped at once."""
+    if not password:
         return None
+    return hashlib.blake2b(
+        password.encode(), key=FINGERPRINT_KEY, digest_size=16
+    ).digest()
+
+
+# --group-by rules: what makes two logins duplicates
+GROUPINGS = {
+    "site": "same username on the same registrable domain",
+    "site+password": "same username, site and password",
+    "username": "same username, whatever the site",
+}
+
+
+def item_site(item: dict) -> str:
+    """Registrable domain of the item's primary URL ("" without URLs).
+
+    An IP address is its own site: 192.168.0.1 and 10.0.0.1 never match.
+    """
+    urls = item.get("urls") or []
+    primary = next((u for u in urls if u.get("primary")), urls[0] if urls else {})
+    return site_of(primary.get("href", ""))
+
+
+@cache
+def site_of(url: str) -> str:
+    # Vaults repeat the same few URLs a lot; resolve each one once
+    host = normalize_domain(url)
+    return registrable_domain(host) if host else ""
+
+
+def duplicate_key(
+    item: dict, login: tuple[str | None, bytes | None] | None, rule: str
+) -> tuple | None:
+    """Normalized composite key; items sharing a key are duplicates.
+
+    `login` is the (username, password fingerprint) pair from scan_logins, or
+    None when the item could not be fetched. The key is None (never a
+    duplicate) for an item that could not be fetched, without a username, or
+    without a URL for the site rules: the same username alone does not make
+    two logins the same. A login without a password still has a key under
+    site+password, shared only with other logins without one.
+
+    >>> bank = {"urls": [{"href": "https://bank.example.com/login"}]}
+    >>> duplicate_key(bank, ("Me@x ", b"fp"), "site+password")
+    ('me@x', 'example.com', b'fp')
+    >>> duplicate_key(bank, ("me@x", None), "site+password")
+    ('me@x', 'example.com', None)
+    >>> duplicate_key(bank, None, "site+password") is None  # fetch failed
+    True
+    >>> duplicate_key({"urls": []}, ("me@x", b"fp"), "site") is None
+    True
+    >>> duplicate_key({"urls": []}, ("me@x", None), "username")
+    ('me@x',)
+    """
+    if login is None:
+        return None
+    username, password_hash = login
+    name = (username or "").strip().casefold()
+    if not name:
+        return None
+    if rule == "username":
+        return (name,)
+    site = item_site(item)
+    if not site:
+        return None
+    if rule == "site+password":
+        return (name, site, password_hash)
+    return (name, site)
+
+
+def group_label(key: tuple) -> str:
+    label = f"Username: {key[0]}"
+    if len(key) > 1:
+        label += f" on {key[1]}"
+    if len(key) > 2:
+        label += " (same password)"
+    return label
+
 
+def is_rate_limited(error: str | None) -> bool:
+    """Whether an op error means 1Password is throttling us."""
+    error = (error or "").lower()
+    return "429" in error or "too many requests" in error or "rate limit" in error
 
-def extract_username(item: dict) -> str | None:
-    """Extract username from item details."""
-    for field in item.get("fields", []):
-        fid = field.get("id", "")
-        purpose = field.get("purpose", "")
-        if purpose == "USERNAME" or fid == "username":
-            return field.get("value")
-    return None
 
+class AdaptiveLimiter:
+    """Bounds concurrent op calls and adapts the bound to rate limiting.
 
-def delete_item(item_id: str) -> bool:
-    """Delete an item from 1Password."""
+    A rate limit halves the bound and pauses every worker for a jittered,
+    exponentially growing delay; the bound then grows back by one slot per
+    `limit` consecutive successes, up to max_workers.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self.limit = max_workers
+        self.active = 0
+        self.successes = 0
+        self.backoff = 0.0
+        self.resume_at = 0.0
+        self.cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self.cond:
+            while True:
+                wait = self.resume_at - time.monotonic()
+                if wait > 0:
+                    self.cond.wait(wait)
+                elif self.active >= self.limit:
+                    self.cond.wait()
+                else:
+                    self.active += 1
+                    return
+
+    def release(self, rate_limited: bool) -> None:
+        with self.cond:
+            self.active -= 1
+            now = time.monotonic()
+            if rate_limited:
+                self.successes = 0
+                # Calls already in flight during a pause don't shrink it again
+                if now >= self.resume_at:
+                    self.limit = max(1, self.limit // 2)
+                    self.backoff = min(60.0, self.backoff * 2 or 1.0)
+                    self.resume_at = now + self.backoff * random.uniform(0.5, 1.0)
+            else:
+                self.successes += 1
+                if self.successes >= self.limit:
+                    self.successes = 0
+                    self.backoff /= 2
+                    self.limit = min(self.max_workers, self.limit + 1)
+            self.cond.notify_all()
+
+
+class Progress:
+    """Live "done/total, items/s, ETA" line on stderr."""
+
+    def __init__(self, total: int, verb: str = "Scanned"):
+        self.total = total
+        self.verb = verb
+        self.done = 0
+        self.started = time.monotonic()
+        self.printed = 0.0
+        self.lock = threading.Lock()
+        # Rewrite one line on a terminal, print a line every few seconds otherwise
+        self.tty = sys.stderr.isatty()
+        self.interval = 0.5 if self.tty else 5.0
+
+    def advance(self, workers: int) -> None:
+        with self.lock:
+            self.done += 1
+            now = time.monotonic()
+            if now - self.printed < self.interval and self.done < self.total:
+                return
+            self.printed = now
+            rate = self.done / max(now - self.started, 1e-9)
+            eta = (self.total - self.done) / rate
+            start = "\r" if self.tty else ""
+            print(
+                f"{start}  {self.verb} {self.done}/{self.total} "
+                f"({rate:.1f} items/s, ETA {int(eta // 60)}m{int(eta % 60):02d}s, "
+                f"{workers} workers)",
+                end="" if self.tty and self.done < self.total else "\n",
+                file=sys.stderr,
+                flush=True,
+            )
+
+
+class Checkpoint:
+    """Usernames already scanned, by item id, with the item's updated_at.
+
+    Saved atomically (0600) every few seconds while scanning so an interrupted
+    run resumes where it stopped. An entry is reused only while the item's
+    updated_at is unchanged. Passwords are never written.
+    """
+
+    def __init__(self, path: Path, entries: dict[str, dict]):
+        self.path = path
+        self.entries = entries
+        self.saved = time.monotonic()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: Path) -> "Checkpoint":
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            entries = data["items"] if data.get("version") == 1 else {}
+        except (OSError, ValueError, KeyError, AttributeError):
+            entries = {}
+        return cls(path, entries)
+
+    def lookup(self, item: dict) -> tuple[bool, str | None]:
+        """(hit, username) for an item scanned at its current revision."""
+        entry = self.entries.get(item["id"])
+        if entry and entry.get("updated_at") == item.get("updated_at"):
+            return True, entry.get("username")
+        return False, None
+
+    def record(self, item: dict, username: str | None) -> None:
+        with self.lock:
+            self.entries[item["id"]] = {
+                "updated_at": item.get("updated_at"),
+                "username": username,
+            }
+            if time.monotonic() - self.saved >= 5:
+                self._save()
+
+    def save(self, live_ids: set[str] | None = None) -> None:
+        """Write the checkpoint, dropping items no longer in the listing."""
+        with self.lock:
+            if live_ids is not None:
+                self.entries = {i: e for i, e in self.entries.items() if i in live_ids}
+            self._save()
+
+    def _save(self) -> None:
+        self.saved = time.monotonic()
+        try:
+            self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump({"version": 1, "items": self.entries}, handle)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"\n  Could not save checkpoint: {e}", file=sys.stderr)
+
+
+def scan_logins(
+    items: list[dict], jobs: int, checkpoint: Checkpoint, passwords: bool = False
+) -> list[tuple[str | None, bytes | None] | None]:
+    """Fetch (username, password fingerprint) of every item, `jobs` at a time.
+
+    Items found unchanged in the checkpoint are not fetched again, except when
+    password fingerprints are wanted: those are never stored. An item whose
+    fetch failed gets None, never a username from an older checkpoint paired
+    with a missing fingerprint.
+    """
+    fingerprints: dict[str, bytes | None] = {}
+    todo = [item for item in items if passwords or not checkpoint.lookup(item)[0]]
+    if len(todo) < len(items):
+        print(f"Resuming: {len(items) - len(todo)} items already scanned.")
+    limiter = AdaptiveLimiter(jobs)
+    progress = Progress(len(todo))
+
+    def scan(item: dict) -> None:
+        for _ in range(MAX_ATTEMPTS):
+            limiter.acquire()
+            username, password, error = get_login(item["id"], passwords)
+            limited = is_rate_limited(error)
+            limiter.release(limited)
+            if not limited:
+                break
+        # Failed fetches are left out so the next run retries them
+        if error is None:
+            checkpoint.record(item, username)
+            if passwords:
+                fingerprints[item["id"]] = fingerprint(password)
+        del password
+        progress.advance(limiter.limit)
+
+    pool = ThreadPoolExecutor(max_workers=jobs)
+    try:
+        list(pool.map(scan, todo))
+    except KeyboardInterrupt:
+        pool.shutdown(wait=True, cancel_futures=True)
+        checkpoint.save()
+        print(f"\nInterrupted. Progress saved to {checkpoint.path}", file=sys.stderr)
+        sys.exit(130)
+    pool.shutdown()
+    checkpoint.save({item["id"] for item in items})
+    logins = []
+    for item in items:
+        hit, username = checkpoint.lookup(item)
+        if passwords:
+            hit = item["id"] in fingerprints
+        logins.append((username, fingerprints.get(item["id"])) if hit else None)
+    return logins
+
+
+def delete_item(item_id: str) -> tuple[bool, str | None]:
+    """Delete an item from 1Password. Returns (success, error)."""
     success, output = run_op(["item", "delete", item_id])
-    if not success:
-        print(f"  Failed to delete: {output}", file=sys.stderr)
-        return False
-    return True
+    return (True, None) if success else (False, output)
+
+
+def is_transient(error: str | None) -> bool:
+    """Whether a failed op call is worth retrying."""
+    error = (error or "").lower()
+    return is_rate_limited(error) or any(
+        hint in error for hint in ("timed out", "timeout", "connection", "temporar")
+    )
+
+
+class TokenBucket:
+    """Allows `rate` calls per second on average, in bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.burst, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Journal:
+    """Append-only NDJSON record of each deletion outcome (ids and titles only).
+
+    Items already deleted in an earlier run are skipped when the plan is
+    applied again, so a rerun only finishes the remaining deletions.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def completed(self) -> set[str]:
+        done = set()
+        try:
+            with self.path.open(encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line of an interrupted run
+                    if entry.get("outcome") in ("deleted", "gone"):
+                        done.add(entry["id"])
+        except OSError:
+            pass
+        return done
+
+    def record(self, item: dict, outcome: str, error: str | None = None) -> None:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "id": item["id"],
+            "title": item["title"],
+            "outcome": outcome,
+        }
+        if error:
+            entry["error"] = error
+        with self.lock:
+            self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+            with os.fdopen(fd, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+
+def delete_items(
+    items: list[dict], jobs: int, rate: float, journal: Journal
+) -> dict[str, int]:
+    """Delete items with `jobs` workers, at most `rate` deletions per second.
+
+    Transient failures (rate limits, timeouts) are retried with jittered
+    exponential backoff. Every outcome is journaled. Returns outcome counts.
+    """
+    bucket = TokenBucket(rate, burst=max(1, jobs))
+    progress = Progress(len(items), verb="Deleted")
+    counts = {"deleted": 0, "gone": 0, "failed": 0}
+    lock = threading.Lock()
+
+    def delete(item: dict) -> None:
+        for attempt in range(MAX_ATTEMPTS):
+            bucket.take()
+            success, error = delete_item(item["id"])
+            if success or not is_transient(error):
+                break
+            time.sleep(min(30.0, 2**attempt) * random.uniform(0.5, 1.0))
+        if success:
+            outcome = "deleted"
+        elif "isn't an item" in (error or ""):
+            outcome = "gone"  # Deleted already, e.g. by an interrupted run
+        else:
+            outcome = "failed"
+            print(f"\n  Failed to delete {item['title']}: {error}", file=sys.stderr)
+        journal.record(item, outcome, None if success else error)
+        with lock:
+            counts[outcome] += 1
+        progress.advance(jobs)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        list(pool.map(delete, items))
+    return counts
+
+
+def plan_entry(item: dict) -> dict:
+    """What a plan records about an item: no usernames or passwords."""
+    return {
+        "id": item["id"],
+        "title": item.get("title", "Untitled"),
+        "vault": item.get("vault", {}).get("name", "Unknown"),
+        "updated_at": item.get("updated_at", ""),
+    }
+
+
+def write_plan(path: Path, group_by: str, plan: list[dict]) -> None:
+    """Save the keep/delete plan (0600) for a later `--apply`."""
+    data = {
+        "version": 1,
+        "created_at": datetime.now(UTC).isoformat(timespec="seconds"),
+        "group_by": group_by,
+        "groups": plan,
+    }
+    tmp = path.with_name(path.name + ".tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as handle:
+        json.dump(data, handle, indent=2)
+    os.replace(tmp, path)
+
+
+def load_plan(path: Path) -> list[dict]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        sys.exit(f"Could not read plan {path}: {e}")
+    if not isinstance(data, dict) or data.get("version") != 1:
+        sys.exit(f"{path} is not a dedup plan")
+    return data.get("groups", [])
+
+
+def verify_plan(plan: list[dict], items: list[dict]) -> tuple[list[dict], int, int]:
+    """Planned deletions still safe to make, against a fresh listing.
+
+    An item is deleted only if its updated_at matches the plan, and only
+    while the group's kept item also still exists unchanged. Returns
+    (to_delete, changed, missing).
+    """
+    current = {item["id"]: item.get("updated_at", "") for item in items}
+    to_delete: list[dict] = []
+    changed = missing = 0
+    for group in plan:
+        keep = group["keep"]
+        if current.get(keep["id"]) != keep["updated_at"]:
+            print(f"{group['label']}")
+            print(f"  SKIP: kept item {keep['title']} changed or was removed")
+            changed += len(group["delete"])
+            continue
+        for item in group["delete"]:
+            if item["id"] not in current:
+                missing += 1
+            elif current[item["id"]] != item["updated_at"]:
+                print(f"  SKIP: {item['title']} changed since the plan was made")
+                changed += 1
+            else:
+                to_delete.append(item)
+    return to_delete, changed, missing
+
+
+def run_deletions(to_delete: list[dict], args: argparse.Namespace) -> None:
+    print("Deleting duplicates...")
+
+    journal = Journal(args.journal)
+    done = journal.completed()
+    remaining = [item for item in to_delete if item["id"] not in done]
+    if len(remaining) < len(to_delete):
+        print(f"  Skipping {len(to_delete) - len(remaining)} already deleted items.")
+    counts = delete_items(
+        remaining, max(1, args.jobs), max(0.1, args.delete_rate), journal
+    )
+
+    # Let a running broker drop the deleted items from its caches
+    broker_request({"op": "refresh"})
+
+    print()
+    print(
+        f"Done! Deleted {counts['deleted']} items, {counts['gone']} already gone, "
+        f"{counts['failed']} failures. Outcomes logged to {journal.path}"
+    )
+
+
+def apply_plan(args: argparse.Namespace) -> None:
+    plan = load_plan(args.apply)
+    print(f"Checking {args.apply} against the vault...")
+    items = get_all_items()
+    if not items:
+        print("No items found or error occurred.")
+        return
+
+    to_delete, changed, missing = verify_plan(plan, items)
+    print()
+    print(
+        f"{len(to_delete)} items to delete, {changed} skipped as changed, "
+        f"{missing} already gone."
+    )
+    if to_delete:
+        print()
+        run_deletions(to_delete, args)
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Remove duplicate 1Password logins")
+    parser.add_argument(
+        "--group-by",
+        choices=list(GROUPINGS),
+        default="site",
+        help="Duplicate rule: "
+        + "; ".join(f"{name} = {desc}" for name, desc in GROUPINGS.items()),
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=8,
+        help="Concurrent op calls while scanning (lowered automatically if throttled)",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=Path,
+        default=DEFAULT_CHECKPOINT,
+        help=f"Scan progress file (default: {DEFAULT_CHECKPOINT})",
+    )
+    parser.add_argument(
+        "--fresh", action="store_true", help="Ignore the checkpoint and rescan"
+    )
+    parser.add_argument(
+        "--delete-rate",
+        type=float,
+        default=4.0,
+        help="Maximum deletions per second (default: 4)",
+    )
+    parser.add_argument(
+        "--journal",
+        type=Path,
+        default=DEFAULT_JOURNAL,
+        help=f"Deletion outcome log (default: {DEFAULT_JOURNAL})",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--plan-out",
+        type=Path,
+        metavar="PATH",
+        help="Write the keep/delete plan to PATH and exit without deleting",
+    )
+    mode.add_argument(
+        "--apply",
+        type=Path,
+        metavar="PATH",
+        help="Delete per a plan from --plan-out, without rescanning",
+    )
+    args = parser.parse_args()
+
     print("1Password Deduplication Tool")
     print("=" * 40)
     print()
 
+    if args.apply:
+        apply_plan(args)
+        return
+
     # Get all items
     print("Fetching all login items...")
     items = get_all_items()
@@ -86,55 +697,69 @@ def main():
     print(f"Found {len(items)} login items. Analyzing...")
     print()
 
-    # Group items by username
-    by_username: dict[str, list[dict]] = defaultdict(list)
+    # Bucket items by their duplicate key, in one pass
+    groups: dict[tuple, list[dict]] = defaultdict(list)
 
-    for item in items:
-        details = get_item_details(item["id"])
-        if not details:
-            continue
-        username = extract_username(details)
-        if username:
-            by_username[username].append(
-                {
-                    "id": item["id"],
-                    "title": item.get("title", "Untitled"),
-                    "vault": item.get("vault", {}).get("name", "Unknown"),
-                    "updated_at": item.get("updated_at", ""),
-                }
-            )
+    checkpoint = (
+        Checkpoint(args.checkpoint, {})
+        if args.fresh
+        else Checkpoint.load(args.checkpoint)
+    )
+    logins = scan_logins(
+        items, max(1, args.jobs), checkpoint, args.group_by == "site+password"
+    )
+    print()
+    if failed := logins.count(None):
+        print(
+            f"Could not scan {failed} items; they are left out of the groups. "
+            "Run again to retry them."
+        )
+        print()
+    for item, login in zip(items, logins):
+        key = duplicate_key(item, login, args.group_by)
+        if key:
+            groups[key].append(plan_entry(item))
 
     # Find duplicates
-    duplicates = {u: items for u, items in by_username.items() if len(items) > 1}
+    duplicates = {k: items for k, items in groups.items() if len(items) > 1}
 
     if not duplicates:
         print("No duplicates found!")
         return
 
-    print(f"Found {len(duplicates)} usernames with duplicates:")
+    print(
+        f"Found {len(duplicates)} groups with duplicates ({GROUPINGS[args.group_by]}):"
+    )
     print()
 
     total_to_delete = 0
-    deletion_plan: list[tuple[str, list[dict]]] = []
+    deletion_plan: list[dict] = []
 
-    for username, items in sorted(duplicates.items()):
+    for key, items in sorted(duplicates.items(), key=lambda kv: kv[0][:2]):
         # Sort by updated_at descending, keep the most recent
         items_sorted = sorted(items, key=lambda x: x["updated_at"], reverse=True)
         keep = items_sorted[0]
         to_delete = items_sorted[1:]
 
-        print(f"Username: {username}")
+        label = group_label(key)
+        print(label)
         print(f"  KEEP: {keep['title']} (vault: {keep['vault']})")
         for item in to_delete:
             print(f"  DELETE: {item['title']} (vault: {item['vault']})")
         print()
 
-        deletion_plan.append((username, to_delete))
+        deletion_plan.append({"label": label, "keep": keep, "delete": to_delete})
         total_to_delete += len(to_delete)
 
     print(f"Total items to delete: {total_to_delete}")
     print()
 
+    if args.plan_out:
+        write_plan(args.plan_out, args.group_by, deletion_plan)
+        print(f"Plan written to {args.plan_out}. Review it, then run:")
+        print(f"  dedup.py --apply {args.plan_out}")
+        return
+
     # Confirm before deletion
     confirm = input("Proceed with deletion? (type 'yes' to confirm): ")
     if confirm.lower() != "yes":
@@ -142,22 +767,7 @@ def main():
         return
 
     print()
-    print("Deleting duplicates...")
-
-    deleted = 0
-    failed = 0
-    for _username, items in deletion_plan:
-        for item in items:
-            print(f"  Deleting: {item['title']}...", end=" ")
-            if delete_item(item["id"]):
-                print("OK")
-                deleted += 1
-            else:
-                print("FAILED")
-                failed += 1
-
-    print()
-    print(f"Done! Deleted {deleted} items, {failed} failures.")
+    run_deletions([item for group in deletion_plan for item in group["delete"]], args)
 
 
 if __name__ == "__main__":
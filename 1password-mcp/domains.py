@@ -0,0 +1,351 @@
+"""Hostname parsing and URL matching shared by the 1Password server and scripts.
+
+Registrable domains (eTLD+1) come from the bundled public suffix list, compiled
+once into a trie of reversed labels; IP addresses only ever match themselves.
+Alias groups (sites sharing credentials) come from domain_aliases.json, or the
+JSON file named by OP_MCP_ALIASES. The examples in the docstrings run with
+`python -m doctest domains.py`.
+"""
+
+from __future__ import annotations
+
+import ipaddress
+import json
+import os
+from functools import cache
+from pathlib import Path
+from urllib.parse import urlsplit
+
+HERE = Path(__file__).resolve().parent
+PSL_PATH = HERE / "public_suffix_list.dat"
+ALIASES_PATH = Path(
+    os.environ.get("OP_MCP_ALIASES") or HERE / "domain_aliases.json"
+).expanduser()
+
+# How a lookup compares the requested host with item hosts
+MATCH_MODES = ("registrable", "domain", "exact")
+
+
+def normalize_domain(url: str) -> str:
+    """Extract the lowercase hostname from a URL or bare domain.
+
+    IP addresses come back in canonical form, without IPv6 brackets.
+
+    >>> normalize_domain("https://WWW.GitHub.com./login")
+    'www.github.com'
+    >>> normalize_domain("http://[2001:DB8:0::1]:8080/")
+    '2001:db8::1'
+    """
+    url = url.strip().lower()
+    if "://" not in url:
+        url = "//" + url
+    try:
+        host = urlsplit(url).hostname or ""
+    except ValueError:
+        return ""
+    host = host.rstrip(".")
+    return ip_literal(host) or host
+
+
+def ip_literal(host: str) -> str | None:
+    """Canonical form of a host that is an IP address (IPv6 may be bracketed).
+
+    Only hosts with a colon or an all-digit last label are parsed, so the
+    common case (a hostname) costs a string check rather than an exception.
+
+    >>> ip_literal("[::1]"), ip_literal("192.168.1.1"), ip_literal("github.com")
+    ('::1', '192.168.1.1', None)
+    """
+    if ":" not in host and not host.rpartition(".")[2].isdigit():
+        return None
+    try:
+        return str(ipaddress.ip_address(host.strip("[]")))
+    except ValueError:
+        return None
+
+
+def _ascii(rule: str) -> str:
+    try:
+        return rule.encode("idna").decode()
+    except UnicodeError:
+        return rule
+
+
+@cache
+def _suffix_trie() -> dict:
+    """Compile the public suffix list into nested dicts keyed by reversed labels.
+
+    The "$" key marks the end of a rule: "!" for exception rules, True
+    otherwise. Wildcard rules (*.ck) live under the "*" label. Unicode rules
+    are stored in both their native and punycode forms.
+    """
+    root: dict = {}
+    for line in PSL_PATH.read_text(encoding="utf-8").splitlines():
+        rule = line.strip()
+        if not rule or rule.startswith("//"):
+            continue
+        exception = rule.startswith("!")
+        rule = rule.lstrip("!")
+        for form in {rule, _ascii(rule)}:
+            node = root
+            for label in reversed(form.split(".")):
+                node = node.setdefault(label, {})
+            node["$"] = "!" if exception else True
+    return root
+
+
+def public_suffix_length(labels: list[str]) -> int:
+    """Number of trailing labels forming the public suffix (at least 1)."""
+    rev = labels[::-1]
+    longest, exception = 1, None
+    stack = [(_suffix_trie(), 0)]
+    while stack:
+        node, depth = stack.pop()
+        if depth == len(rev):
+            continue
+        for key in (rev[depth], "*"):
+            child = node.get(key)
+            if child is None:
+                continue
+            mark = child.get("$")
+            if mark == "!":
+                exception = depth
+            elif mark:
+                longest = max(longest, depth + 1)
+            stack.append((child, depth + 1))
+    # An exception rule wins; its suffix is the rule minus its leftmost label
+    return exception if exception is not None else longest
+
+
+def registrable_domain(host: str) -> str:
+    """eTLD+1 of a host (accounts.google.com -> google.com, a.bbc.co.uk -> bbc.co.uk).
+
+    A host that is itself a public suffix, or an IP address, is returned
+    unchanged: IP addresses have no registrable domain.
+
+    >>> registrable_domain("a.bbc.co.uk"), registrable_domain("192.168.1.1")
+    ('bbc.co.uk', '192.168.1.1')
+    """
+    if ip := ip_literal(host):
+        return ip
+    labels = host.split(".")
+    n = public_suffix_length(labels)
+    return ".".join(labels[-(n + 1) :]) if len(labels) > n else host
+
+
+@cache
+def _alias_groups() -> dict[str, tuple[str, ...]]:
+    """Map each aliased registrable domain to its whole group."""
+    try:
+        groups = json.loads(ALIASES_PATH.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+    index: dict[str, tuple[str, ...]] = {}
+    for group in groups:
+        members = tuple(d for d in dict.fromkeys(map(normalize_domain, group)) if d)
+        for domain in members:
+            index[domain] = members
+    return index
+
+
+def aliases(host: str) -> tuple[str, ...]:
+    """The host plus the sites that share its credentials (x.com -> twitter.com)."""
+    group = _alias_groups().get(registrable_domain(host))
+    if not group:
+        return (host,)
+    return tuple(dict.fromkeys([host, *group]))
+
+
+def item_metadata(item: dict, hosts: list[str]) -> dict:
+    """What may be stored on disk about an item: never fields, notes or usernames."""
+    vault = item.get("vault") or {}
+    return {
+        "id": item["id"],
+        "title": item.get("title"),
+        "hosts": hosts,
+        "vault": {"id": vault.get("id"), "name": vault.get("name")},
+        "updated_at": item.get("updated_at"),
+    }
+
+
+def _trie_labels(host: str) -> list[str]:
+    """Trie path of a host: reversed labels, or the whole address for an IP.
+
+    Keeping an IP address as one label means no hostname (such as 1.1) can
+    reach it as a "subdomain".
+    """
+    return [host] if ip_literal(host) else host.split(".")[::-1]
+
+
+class _Node:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children: dict[str, _Node] = {}
+        self.ids: set[str] = set()
+
+
+class DomainIndex:
+    """Hostname index over a vault listing, stored as a trie of reversed labels.
+
+    `gist.github.com` lives at root -> com -> github -> gist, so a lookup walks
+    one node per label instead of scanning every item URL.
+    """
+
+    def __init__(self, items: list[dict]):
+        self.items: dict[str, dict] = {}
+        # Secret-free summary of each item, built once when it is indexed
+        self.metadata: dict[str, dict] = {}
+        self.order: dict[str, int] = {}
+        self.root = _Node()
+        # Item counts touched by the last refresh (see apply)
+        self.last_delta: dict[str, int] = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, item: dict, hosts: list[str] | None = None) -> None:
+        """Index an item under its URL hosts.
+
+        `hosts` skips URL parsing when the normalized hosts are already known
+        (e.g. read back from item_metadata output).
+        """
+        if hosts is None:
+            hosts = sorted(
+                {normalize_domain(u.get("href", "")) for u in item.get("urls", [])}
+                - {""}
+            )
+        self.items[item["id"]] = item
+        self.metadata[item["id"]] = item_metadata(item, hosts)
+        self.order.setdefault(item["id"], len(self.order))
+        for host in hosts:
+            self._node(host, create=True).ids.add(item["id"])
+
+    def remove(self, item_id: str) -> None:
+        item = self.items.pop(item_id, None)
+        if item is None:
+            return
+        self.order.pop(item_id, None)
+        for host in self.metadata.pop(item_id)["hosts"]:
+            labels = _trie_labels(host)
+            path = [self.root]
+            for label in labels:
+                child = path[-1].children.get(label)
+                if child is None:
+                    break
+                path.append(child)
+            else:
+                path[-1].ids.discard(item_id)
+                # Prune branches left without items
+                for label, parent, node in zip(
+                    reversed(labels),
+                    reversed(path[:-1]),
+                    reversed(path[1:]),
+                    strict=True,
+                ):
+                    if node.ids or node.children:
+                        break
+                    del parent.children[label]
+
+    def apply(self, items: list[dict]) -> tuple[set[str], set[str], set[str]]:
+        """Patch the index to a new listing, diffing on id + updated_at.
+
+        Only added, changed and removed items touch the trie. Returns their ids.
+        """
+        fresh = {item["id"]: item for item in items}
+        removed = self.items.keys() - fresh.keys()
+        added, changed = set(), set()
+        for item_id, item in fresh.items():
+            old = self.items.get(item_id)
+            if old is None:
+                added.add(item_id)
+            elif old.get("updated_at") != item.get("updated_at"):
+                changed.add(item_id)
+            else:
+                # Same revision: keep the trie, take the richer listing entry
+                self.items[item_id] = item
+        for item_id in removed | changed:
+            self.remove(item_id)
+        for item_id in added | changed:
+            self.add(fresh[item_id])
+        return added, changed, removed
+
+    def _node(self, host: str, create: bool = False) -> _Node | None:
+        node = self.root
+        for label in _trie_labels(host):
+            child = node.children.get(label)
+            if child is None:
+                if not create:
+                    return None
+                child = node.children[label] = _Node()
+            node = child
+        return node
+
+    def _collect(self, ids: set[str]) -> list[dict]:
+        # Preserve listing order so results are stable across lookups
+        return [self.items[i] for i in sorted(ids, key=self.order.__getitem__)]
+
+    def exact(self, host: str) -> list[dict]:
+        """Items with a URL on exactly this host."""
+        node = self._node(host)
+        return self._collect(node.ids) if node else []
+
+    def under(self, host: str) -> list[dict]:
+        """Items with a URL on this host or any of its subdomains."""
+        node = self._node(host)
+        if node is None:
+            return []
+        ids: set[str] = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            ids |= node.ids
+            stack.extend(node.children.values())
+        return self._collect(ids)
+
+    def registrable(self, host: str) -> list[dict]:
+        """Items anywhere under the registrable domain of this host.
+
+        A bare public suffix (co.uk, github.io) or an IP address only matches
+        itself exactly.
+        """
+        labels = host.split(".")
+        if ip_literal(host) or public_suffix_length(labels) >= len(labels):
+            return self.exact(host)
+        return self.under(registrable_domain(host))
+
+    def find(self, url: str, match: str = "registrable") -> list[dict]:
+        """Items matching a URL/domain and its aliases.
+
+        match="registrable" returns anything under the same registrable domain
+        (accounts.google.com finds mail.google.com), "domain" items on the host
+        or its subdomains, "exact" only items on the host itself. An IP address
+        only ever matches the same address.
+
+        >>> index = DomainIndex([
+        ...     {"id": "lan", "urls": [{"href": "http://192.168.1.1:8080/"}]},
+        ...     {"id": "v6", "urls": [{"href": "https://[2001:db8::1]/"}]},
+        ...     {"id": "gh", "urls": [{"href": "https://github.com/login"}]},
+        ... ])
+        >>> [i["id"] for i in index.find("192.168.1.1")]
+        ['lan']
+        >>> index.find("10.1.1.1") + index.find("55.1.1.1") + index.find("1.1")
+        []
+        >>> [i["id"] for i in index.find("[2001:DB8:0::1]")], index.find("::2")
+        (['v6'], [])
+        >>> [i["id"] for i in index.find("gist.github.com")]
+        ['gh']
+        """
+        host = normalize_domain(url)
+        if not host:
+            return []
+        if ip_literal(host):
+            lookup = self.exact
+        else:
+            lookup = {"exact": self.exact, "domain": self.under}.get(
+                match, self.registrable
+            )
+        matching: dict[str, dict] = {}
+        for alias in aliases(host):
+            for item in lookup(alias):
+                matching.setdefault(item["id"], item)
+        return list(matching.values())
@@ -5,11 +5,26 @@
 # ///
 """1Password MCP server with URL-based credential lookup."""
 
+import argparse
 import asyncio
+import base64
+import hashlib
+import itertools
 import json
+import math
+import os
 import platform
-import subprocess
+import shutil
+import signal
+import time
+import zlib
+from collections import OrderedDict, deque
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from pathlib import Path
 
+from broker_client import SOCKET_PATH, extract_credentials
+from domains import MATCH_MODES, DomainIndex, normalize_domain
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import TextContent, Tool
@@ -17,130 +32,968 @@ from mcp.types import TextContent, Tool
 server = Server("1password")
 
 
-def copy_to_clipboard(text: str) -> tuple[bool, str]:
+# Clipboard tools per platform as (copy, paste) commands, in order of preference
+CLIPBOARD_TOOLS = {
+    "Darwin": [(["pbcopy"], ["pbpaste"])],
+    "Linux": [
+        (
+            ["xclip", "-selection", "clipboard"],
+            ["xclip", "-selection", "clipboard", "-o"],
+        ),
+        (["xsel", "--clipboard", "--input"], ["xsel", "--clipboard", "--output"]),
+    ],
+    "Windows": [
+        (["clip.exe"], ["powershell.exe", "-NoProfile", "-Command", "Get-Clipboard"])
+    ],
+}
+
+# Seconds after which a copied password is cleared from the clipboard (0 = never)
+CLIPBOARD_CLEAR = float(os.environ.get("OP_MCP_CLIPBOARD_CLEAR", "0"))
+
+
+def detect_clipboard() -> tuple[list[str], list[str] | None] | None:
+    """Pick the first installed clipboard tool for this platform."""
+    for copy, paste in CLIPBOARD_TOOLS.get(platform.system(), []):
+        if shutil.which(copy[0]):
+            return copy, paste if shutil.which(paste[0]) else None
+    return None
+
+
+class Clipboard:
+    """Clipboard writer using the tool detected once at startup.
+
+    Copies run as asyncio subprocesses, so the event loop keeps serving other
+    tool calls. With clear_after set, a background task empties the clipboard
+    later unless its content changed meanwhile; only a digest of the copied
+    text is kept for that check. Without a paste tool the content cannot be
+    checked, so it is never cleared.
+    """
+
+    def __init__(
+        self, tools: tuple[list[str], list[str] | None] | None, clear_after: float
+    ):
+        self.tools = tools
+        self.clear_after = clear_after
+        self.clear_task: asyncio.Task | None = None
+        self.digest: bytes | None = None
+
+    async def copy(self, text: str) -> tuple[bool, str]:
+        """Copy text to system clipboard. Returns (success, message)."""
+        if self.tools is None:
+            return False, f"Clipboard tool not found for platform: {platform.system()}"
+        success, message = await self._write(text)
+        if success and self.clear_after > 0 and self.tools[1]:
+            if self.clear_task:
+                self.clear_task.cancel()
+            self.digest = hashlib.sha256(text.encode()).digest()
+            self.clear_task = asyncio.create_task(self._clear_later())
+        return success, message
+
+    async def _write(self, text: str) -> tuple[bool, str]:
+        # xclip/xsel keep a child serving the selection; it must not hold our pipes
+        proc = await asyncio.create_subprocess_exec(
+            *self.tools[0],
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        try:
+            await asyncio.wait_for(proc.communicate(text.encode()), 5)
+        except TimeoutError:
+            proc.kill()
+            return False, "Failed to copy to clipboard: timed out"
+        if proc.returncode != 0:
+            return False, f"Failed to copy to clipboard: exit code {proc.returncode}"
+        return True, "Password copied to clipboard"
+
+    async def _clear_later(self) -> None:
+        await asyncio.sleep(self.clear_after)
+        # Nobody awaits this task; a failed clear leaves the clipboard as is
+        with suppress(OSError):
+            await self._clear()
+
+    async def flush(self) -> None:
+        """Run a pending clear now, e.g. on shutdown, instead of dropping it."""
+        if self.clear_task and not self.clear_task.done():
+            self.clear_task.cancel()
+            with suppress(OSError):
+                await self._clear()
+
+    async def _clear(self) -> None:
+        """Empty the clipboard if it still holds what we copied."""
+        digest, self.digest = self.digest, None
+        paste = self.tools[1] if self.tools else None
+        if digest is None or paste is None:
+            return
+        proc = await asyncio.create_subprocess_exec(
+            *paste,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        try:
+            current, _ = await asyncio.wait_for(proc.communicate(), 5)
+        except TimeoutError:
+            proc.kill()
+            return
+        # Windows' Get-Clipboard appends a newline
+        if digest not in (
+            hashlib.sha256(current).digest(),
+            hashlib.sha256(current.rstrip(b"\r\n")).digest(),
+        ):
+            return  # The user copied something else since
+        await self._write("")
+
+    def stats(self) -> dict:
+        return {
+            "tool": self.tools[0][0] if self.tools else None,
+            "clear_after_seconds": self.clear_after,
+            # Auto-clear only runs when the content can be checked first
+            "can_clear": bool(self.tools and self.tools[1]),
+        }
+
+
+clipboard = Clipboard(detect_clipboard(), CLIPBOARD_CLEAR)
+
+
+async def copy_to_clipboard(text: str) -> tuple[bool, str]:
     """Copy text to system clipboard. Returns (success, message)."""
-    system = platform.system()
     try:
-        if system == "Darwin":
-            subprocess.run(["pbcopy"], input=text.encode(), check=True)
-        elif system == "Linux":
-            # Try xclip first, fall back to xsel
-            try:
-                subprocess.run(
-                    ["xclip", "-selection", "clipboard"],
-                    input=text.encode(),
-                    check=True,
-                )
-            except FileNotFoundError:
-                subprocess.run(
-                    ["xsel", "--clipboard", "--input"], input=text.encode(), check=True
-                )
-        elif system == "Windows":
-            subprocess.run(["clip.exe"], input=text.encode(), check=True)
-        else:
-            return False, f"Unsupported platform: {system}"
-        return True, "Password copied to clipboard"
-    except FileNotFoundError as e:
-        return False, f"Clipboard tool not found: {e}"
-    except subprocess.CalledProcessError as e:
+        return await clipboard.copy(text)
+    except OSError as e:
         return False, f"Failed to copy to clipboard: {e}"
 
 
-# Common domain aliases (sites that share credentials)
-DOMAIN_ALIASES = {
-    "x.com": ["x.com", "twitter.com"],
-    "twitter.com": ["x.com", "twitter.com"],
-}
+# Upper bound on concurrent `op item get` processes per server
+MAX_CONCURRENCY = int(os.environ.get("OP_MCP_MAX_CONCURRENCY", "4"))
+op_slots = asyncio.Semaphore(MAX_CONCURRENCY)
+
+# Seconds before an op call is abandoned (e.g. waiting on `op signin`)
+OP_TIMEOUT = float(os.environ.get("OP_MCP_TIMEOUT", "30"))
+
+
+# Optional NDJSON file receiving one line per finished span and request
+TRACE_FILE = os.environ.get("OP_MCP_TRACE_FILE")
+
+# Most recent samples kept per histogram for percentiles
+STATS_WINDOW = 1024
+
+
+class Histogram:
+    """Count and total of all samples plus a window of the latest for percentiles."""
+
+    __slots__ = ("count", "samples", "total")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.samples: deque[float] = deque(maxlen=STATS_WINDOW)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+    def summary(self) -> dict:
+        ordered = sorted(self.samples)
+
+        def rank(p: float) -> float:
+            return round(ordered[max(0, math.ceil(p * len(ordered)) - 1)], 3)
+
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3),
+            "p50": rank(0.5),
+            "p95": rank(0.95),
+            "p99": rank(0.99),
+            "max": round(ordered[-1], 3),
+        }
 
 
-def run_op(args: list[str]) -> tuple[bool, str]:
-    """Execute op CLI command, return (success, output)."""
+# The request (tool call or broker request) the current task is serving
+current_request: ContextVar[dict | None] = ContextVar("current_request", default=None)
+
+
+class Metrics:
+    """In-memory latency histograms (milliseconds) per tool and per phase.
+
+    A request wraps one tool call; spans time its phases (`op item list`,
+    `parse item get`, `clipboard`, ...). Work done by a coalesced call is
+    attributed to the request that started it.
+    """
+
+    def __init__(self, trace_path: str | None):
+        self.tools: dict[str, Histogram] = {}
+        self.phases: dict[str, Histogram] = {}
+        self.op_calls: dict[str, Histogram] = {}
+        self.ids = itertools.count(1)
+        self.trace_path = trace_path
+        # O_APPEND descriptor: each event is one write, so a server and a broker
+        # can share a trace file without interleaving lines
+        self.trace: int | None = None
+
+    @contextmanager
+    def request(self, tool: str):
+        request = {"id": next(self.ids), "tool": tool, "op_calls": 0}
+        token = current_request.set(request)
+        started = time.perf_counter()
+        try:
+            yield request
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            current_request.reset(token)
+            self.tools.setdefault(tool, Histogram()).add(ms)
+            self.op_calls.setdefault(tool, Histogram()).add(request["op_calls"])
+            self._emit(request, {"ms": round(ms, 3), "op_calls": request["op_calls"]})
+
+    @contextmanager
+    def span(self, phase: str):
+        request = current_request.get()
+        if request is not None and phase.startswith("op "):
+            request["op_calls"] += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            self.phases.setdefault(phase, Histogram()).add(ms)
+            self._emit(request, {"span": phase, "ms": round(ms, 3)})
+
+    def _emit(self, request: dict | None, event: dict) -> None:
+        if not self.trace_path:
+            return
+        if request is not None:
+            event = {"request": request["id"], "tool": request["tool"], **event}
+        try:
+            if self.trace is None:
+                self.trace = os.open(
+                    self.trace_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600
+                )
+            line = json.dumps({"ts": round(time.time(), 6), **event}) + "\n"
+            os.write(self.trace, line.encode())
+        except OSError:
+            self.trace_path = None  # Stop tracing rather than fail lookups
+
+    def close(self) -> None:
+        if self.trace is not None:
+            os.close(self.trace)
+            self.trace = None
+
+    def stats(self) -> dict:
+        return {
+            "tools_ms": {k: h.summary() for k, h in sorted(self.tools.items())},
+            "phases_ms": {k: h.summary() for k, h in sorted(self.phases.items())},
+            "op_calls_per_request": {
+                k: h.summary() for k, h in sorted(self.op_calls.items())
+            },
+            "trace_file": self.trace_path,
+        }
+
+
+metrics = Metrics(TRACE_FILE)
+
+
+async def run_op(args: list[str], timeout: float = OP_TIMEOUT) -> tuple[bool, str]:
+    """Execute op CLI command without blocking the event loop, return (success, output).
+
+    stdin is closed so op fails fast instead of prompting on the MCP stdio
+    stream. The child is killed if the call times out or the awaiting task is
+    cancelled, so other tool calls keep being served meanwhile.
+    """
+    with metrics.span(" ".join(["op", *args[:2]])):
+        return await _run_op(args, timeout)
+
+
+async def _run_op(args: list[str], timeout: float) -> tuple[bool, str]:
     try:
-        result = subprocess.run(
-            ["op", *args], capture_output=True, text=True, timeout=30
+        proc = await asyncio.create_subprocess_exec(
+            "op",
+            *args,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
         )
-        if result.returncode != 0:
-            return False, result.stderr.strip() or "Unknown error"
-        return True, result.stdout
     except FileNotFoundError:
         return (
             False,
             "op CLI not installed. Get it from https://1password.com/downloads/command-line/",
         )
-    except subprocess.TimeoutExpired:
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except (TimeoutError, asyncio.CancelledError) as e:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        if isinstance(e, asyncio.CancelledError):
+            raise
         return False, "Timed out. Run `op signin` to authenticate."
+    if proc.returncode != 0:
+        return False, stderr.decode().strip() or "Unknown error"
+    return True, stdout.decode()
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Deduplicate identical in-flight calls: concurrent callers with the same
+    key await one shared task instead of each spawning their own `op` process.
+
+    The shared task is cancelled only when its last waiter is cancelled.
+    """
+
+    def __init__(self):
+        self.inflight: dict[tuple, _Flight] = {}
+        self.hits: dict[str, int] = {}
+
+    async def run(self, key: tuple, factory):
+        flight = self.inflight.get(key)
+        if flight is None:
+            flight = self.inflight[key] = _Flight(asyncio.ensure_future(factory()))
+            flight.task.add_done_callback(lambda _: self._done(key, flight))
+        else:
+            self.hits[key[0]] = self.hits.get(key[0], 0) + 1
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1:
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _done(self, key: tuple, flight: _Flight) -> None:
+        if self.inflight.get(key) is flight:
+            del self.inflight[key]
+
+
+single_flight = SingleFlight()
+
+
+class UsernameIndex:
+    """Lowercased username -> item ids.
+
+    Seeded from the listing's `additional_information` (the username of Login
+    items) and corrected by every fetched item detail. Intersected with the
+    domain matches of a lookup, it acts as a (domain, username) -> item index.
+    """
+
+    def __init__(self):
+        self.ids: dict[str, set[str]] = {}
+        self.names: dict[str, str] = {}
+        self.confirmed: set[str] = set()
+
+    def record(self, item_id: str, username: str | None, confirmed: bool) -> None:
+        """Map an item to its username; listing hints never override details."""
+        if not confirmed and item_id in self.confirmed:
+            return
+        self.forget(item_id)
+        if confirmed:
+            self.confirmed.add(item_id)
+        name = (username or "").lower()
+        if name:
+            self.names[item_id] = name
+            self.ids.setdefault(name, set()).add(item_id)
+
+    def record_listing(self, items: list[dict]) -> None:
+        for item in items:
+            if item.get("category") == "LOGIN":
+                self.record(item["id"], item.get("additional_information"), False)
+
+    def forget(self, item_id: str) -> None:
+        self.confirmed.discard(item_id)
+        name = self.names.pop(item_id, None)
+        if name is not None:
+            self.ids[name].discard(item_id)
+            if not self.ids[name]:
+                del self.ids[name]
+
+    def matching(self, items: list[dict], username: str) -> list[dict]:
+        """Items (in order) whose known username equals username."""
+        ids = self.ids.get(username.lower(), set())
+        return [item for item in items if item["id"] in ids]
 
 
-def normalize_domain(url: str) -> str:
-    """Extract domain from URL."""
-    return url.lower().replace("https://", "").replace("http://", "").split("/")[0]
+username_index = UsernameIndex()
 
 
-def extract_creds_from_item(item: dict) -> dict[str, str | None]:
-    """Extract username/password from item dict."""
-    username, password = None, None
-    for f in item.get("fields", []):
-        fid, purpose, val = f.get("id", ""), f.get("purpose", ""), f.get("value")
-        if purpose == "USERNAME" or fid == "username":
-            username = val
-        elif purpose == "PASSWORD" or fid == "password":
-            password = val
-    return {"username": username, "password": password}
+# Seconds a parsed `op item list` result stays fresh (0 disables caching)
+CACHE_TTL = float(os.environ.get("OP_MCP_CACHE_TTL", "300"))
 
 
-def extract_creds(item_json: str) -> dict[str, str | None]:
-    """Extract username/password from op item JSON string."""
+class ListingCache:
+    """In-memory cache of parsed `op item list` output, keyed by vault."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.entries: dict[str | None, tuple[float, DomainIndex]] = {}
+        self.from_snapshot: set[str | None] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def peek(self, vault: str | None) -> DomainIndex | None:
+        """Return the cached listing for a vault even if stale, without counting."""
+        entry = self.entries.get(vault)
+        return entry[1] if entry else None
+
+    def get(self, vault: str | None) -> DomainIndex | None:
+        """Return the cached listing for a vault, or None if absent or stale."""
+        entry = self.entries.get(vault)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def expires_at(self, vault: str | None) -> float | None:
+        """Monotonic time the cached listing for a vault goes stale."""
+        entry = self.entries.get(vault)
+        return entry[0] + self.ttl if entry else None
+
+    def put(
+        self, vault: str | None, index: DomainIndex, from_snapshot: bool = False
+    ) -> None:
+        if self.ttl > 0:
+            self.entries[vault] = (time.monotonic(), index)
+            if from_snapshot:
+                self.from_snapshot.add(vault)
+            else:
+                self.from_snapshot.discard(vault)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        lookups = self.hits + self.misses
+        return {
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+            "vaults": {
+                vault or "(all)": {
+                    "items": len(index.items),
+                    "age_seconds": round(now - fetched_at, 1),
+                    "from_snapshot": vault in self.from_snapshot,
+                }
+                for vault, (fetched_at, index) in self.entries.items()
+            },
+        }
+
+
+listing_cache = ListingCache(CACHE_TTL)
+
+
+# Lookups that found nothing: seconds to remember them and max entries
+NEGATIVE_TTL = float(os.environ.get("OP_MCP_NEGATIVE_TTL", "3600"))
+NEGATIVE_MAX = int(os.environ.get("OP_MCP_NEGATIVE_MAX", "512"))
+
+
+class NegativeCache:
+    """Bounded LRU of (vault, domain, match) lookups that matched no item.
+
+    A hit answers "no items" without touching the listing. An entry never
+    outlives the listing it was computed from, and all entries are dropped as
+    soon as any listing refresh sees added or changed items (an item added to
+    one vault also shows up in the all-vaults listing).
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries: OrderedDict[tuple, float] = OrderedDict()
+        self.hits = 0
+
+    def __contains__(self, key: tuple) -> bool:
+        expires_at = self.entries.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            return False
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return True
+
+    def add(self, key: tuple, not_after: float) -> None:
+        """Remember a miss until `not_after` at the latest (monotonic time)."""
+        expires_at = min(time.monotonic() + self.ttl, not_after)
+        if expires_at <= time.monotonic() or self.max_size <= 0:
+            return
+        self.entries[key] = expires_at
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        return {"ttl_seconds": self.ttl, "size": len(self.entries), "hits": self.hits}
+
+
+negative_cache = NegativeCache(NEGATIVE_TTL, NEGATIVE_MAX)
+
+
+# Opt-in cache of fetched credentials: seconds to keep (0 = off) and max entries
+DETAIL_TTL = float(os.environ.get("OP_MCP_DETAIL_TTL", "0"))
+DETAIL_MAX = int(os.environ.get("OP_MCP_DETAIL_MAX", "16"))
+
+
+class DetailCache:
+    """Short-lived LRU of extracted credentials, keyed by item id.
+
+    The cache's own copy of each password is a bytearray overwritten with
+    zeros when the entry expires, is evicted by the LRU bound, or its item
+    changes in the vault. Each entry schedules its own wipe at expiry instead
+    of waiting for a lookup. Only that copy is wiped: the string parsed from
+    `op` output and the one `get` decodes on every hit are ordinary immutable
+    strings, left to the garbage collector.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries: OrderedDict[
+            str, tuple[str | None, bytearray, asyncio.TimerHandle]
+        ] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, item_id: str) -> dict[str, str | None] | None:
+        if self.ttl <= 0:
+            return None
+        entry = self.entries.get(item_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(item_id)
+        username, password, _ = entry
+        return {"username": username, "password": password.decode() or None}
+
+    def put(self, item_id: str, creds: dict[str, str | None]) -> None:
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        self.evict(item_id)
+        timer = asyncio.get_running_loop().call_later(self.ttl, self.evict, item_id)
+        password = bytearray((creds.get("password") or "").encode())
+        self.entries[item_id] = (creds.get("username"), password, timer)
+        while len(self.entries) > self.max_size:
+            self.evict(next(iter(self.entries)))
+
+    def evict(self, item_id: str) -> None:
+        entry = self.entries.pop(item_id, None)
+        if entry is not None:
+            _, password, timer = entry
+            timer.cancel()
+            password[:] = bytes(len(password))
+
+    def clear(self) -> None:
+        for item_id in list(self.entries):
+            self.evict(item_id)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.ttl > 0 and self.max_size > 0,
+            "ttl_seconds": self.ttl,
+            "max_size": self.max_size,
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+detail_cache = DetailCache(DETAIL_TTL, DETAIL_MAX)
+
+
+def _snapshot_path() -> Path | None:
+    value = os.environ.get("OP_MCP_SNAPSHOT", "")
+    if value in ("", "0"):
+        return None
+    if value != "1":
+        return Path(value).expanduser()
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "1password-mcp" / "listing-snapshot.bin"
+
+
+# Optional on-disk listing snapshot (OP_MCP_SNAPSHOT: unset/0 = off, 1 = default path, else a path)
+SNAPSHOT_PATH = _snapshot_path()
+SNAPSHOT_MAGIC = b"OPMCP-SNAPSHOT-1\n"
+
+
+def snapshot_data() -> dict[str, list[dict]]:
+    """Metadata of every cached listing (see DomainIndex.metadata).
+
+    Runs on the event loop, where the listing cache and indexes are mutated.
+    Entries are built when items are indexed and never modified afterwards,
+    so this only copies references and the lists can be serialized off-loop.
+    """
+    return {
+        vault or "": list(index.metadata.values())
+        for vault, (_, index) in listing_cache.entries.items()
+    }
+
+
+def save_snapshot(data: dict[str, list[dict]]) -> None:
+    """Write snapshot data as zlib-compressed JSON (0600). Safe off the loop."""
+    if SNAPSHOT_PATH is None:
+        return
+    payload = SNAPSHOT_MAGIC + zlib.compress(
+        json.dumps(data, separators=(",", ":")).encode()
+    )
+    SNAPSHOT_PATH.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    tmp = SNAPSHOT_PATH.with_suffix(".tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as handle:
+        handle.write(payload)
+    os.replace(tmp, SNAPSHOT_PATH)
+
+
+def read_snapshot() -> dict[str | None, DomainIndex]:
+    """Parse and index the snapshot, one DomainIndex per vault. Safe off the loop.
+
+    Hosts were normalized before they were saved, so they are indexed as is.
+    """
+    if SNAPSHOT_PATH is None:
+        return {}
     try:
-        item = json.loads(item_json)
-    except json.JSONDecodeError:
-        return {"error": "Failed to parse 1Password response"}
-    return extract_creds_from_item(item)
+        payload = SNAPSHOT_PATH.read_bytes()
+        if not payload.startswith(SNAPSHOT_MAGIC):
+            return {}
+        data = json.loads(zlib.decompress(payload[len(SNAPSHOT_MAGIC) :]))
+    except (OSError, zlib.error, json.JSONDecodeError):
+        return {}
+    indexes = {}
+    for key, entries in data.items():
+        index = DomainIndex([])
+        for e in entries:
+            item = {
+                "id": e["id"],
+                "title": e["title"],
+                "urls": [{"href": host} for host in e["hosts"]],
+                "vault": e["vault"],
+                "updated_at": e["updated_at"],
+            }
+            index.add(item, e["hosts"])
+        indexes[key or None] = index
+    return indexes
 
 
-def find_items_by_url(url: str, vault: str | None = None) -> list[dict]:
-    """Find 1Password items matching a URL/domain."""
-    cmd = ["item", "list", "--format", "json"]
-    if vault:
-        cmd.extend(["--vault", vault])
+async def load_snapshot() -> list[str | None]:
+    """Seed the listing cache from the snapshot. Returns the vaults loaded.
 
-    success, output = run_op(cmd)
-    if not success:
-        return []
+    Snapshot entries are served as fresh until warm-up revalidates them. A
+    vault already listed by a lookup while the snapshot was read is kept.
+    """
+    loaded = []
+    for vault, index in (await asyncio.to_thread(read_snapshot)).items():
+        if listing_cache.peek(vault) is None:
+            listing_cache.put(vault, index, from_snapshot=True)
+            loaded.append(vault)
+    return loaded
 
+
+# Set when this process is the broker, so it never forwards requests to itself
+IS_BROKER = False
+
+
+async def broker_call(payload: dict) -> dict | None:
+    """Forward a request to a running broker. Returns None if there is none."""
+    if IS_BROKER or not SOCKET_PATH.exists():
+        return None
     try:
-        items = json.loads(output)
-    except json.JSONDecodeError:
+        reader, writer = await asyncio.open_unix_connection(
+            str(SOCKET_PATH), limit=2**26
+        )
+    except OSError:
+        return None
+    try:
+        with metrics.span(f"broker {payload['op']}"):
+            writer.write(json.dumps(payload).encode() + b"\n")
+            await writer.drain()
+            line = await asyncio.wait_for(reader.readline(), OP_TIMEOUT * 2)
+        return json.loads(line)
+    except (OSError, ValueError, TimeoutError):
+        return None
+    finally:
+        writer.close()
+
+
+async def load_index(
+    vault: str | None = None, refresh: bool = False
+) -> DomainIndex | None:
+    """Return the indexed `op item list` output for a vault, cached while fresh.
+
+    Returns None if the listing could not be fetched or parsed.
+    """
+    if not refresh:
+        cached = listing_cache.get(vault)
+        if cached is not None:
+            return cached
+    return await single_flight.run(("op item list", vault), lambda: _list(vault))
+
+
+async def _list(vault: str | None) -> DomainIndex | None:
+    response = await broker_call({"op": "list", "vault": vault})
+    if response is not None:
+        if not response.get("ok"):
+            return None
+        items = response["items"]
+    else:
+        cmd = ["item", "list", "--format", "json"]
+        if vault:
+            cmd.extend(["--vault", vault])
+
+        success, output = await run_op(cmd)
+        if not success:
+            return None
+
+        try:
+            with metrics.span("parse item list"):
+                items = json.loads(output)
+        except json.JSONDecodeError:
+            return None
+
+    index = listing_cache.peek(vault)
+    if index is None:
+        with metrics.span("index listing"):
+            index = DomainIndex(items)
+        index.last_delta = {"added": len(index.items), "changed": 0, "removed": 0}
+        negative_cache.invalidate()
+    else:
+        with metrics.span("index listing"):
+            added, changed, removed = index.apply(items)
+        index.last_delta = {
+            "added": len(added),
+            "changed": len(changed),
+            "removed": len(removed),
+        }
+        # Only what we learned about modified or deleted items is stale
+        for item_id in changed | removed:
+            username_index.forget(item_id)
+            detail_cache.evict(item_id)
+        if added or changed:
+            negative_cache.invalidate()
+    listing_cache.put(vault, index)
+    username_index.record_listing(items)
+    # A refresh that changed nothing leaves the snapshot as it is
+    if SNAPSHOT_PATH is not None and any(index.last_delta.values()):
+        try:
+            with metrics.span("snapshot save"):
+                await asyncio.to_thread(save_snapshot, snapshot_data())
+        except OSError:
+            pass  # The snapshot is an optimisation; lookups still work without it
+    return index
+
+
+async def find_items_by_url(
+    url: str, vault: str | None = None, match: str = "registrable"
+) -> list[dict]:
+    """Find 1Password items matching a URL/domain (see DomainIndex.find)."""
+    negative_key = (vault, normalize_domain(url), match)
+    if negative_key in negative_cache:
+        return []
+    index = await load_index(vault)
+    if not index:
         return []
+    items = index.find(url, match)
+    if not items and (expires_at := listing_cache.expires_at(vault)) is not None:
+        negative_cache.add(negative_key, expires_at)
+    return items
 
-    domain = normalize_domain(url)
-    search_domains = DOMAIN_ALIASES.get(domain, [domain])
-
-    matching = []
-    for item in items:
-        item_urls = item.get("urls", [])
-        for url_entry in item_urls:
-            href = url_entry.get("href", "").lower()
-            for sd in search_domains:
-                if sd in href:
-                    matching.append(item)
-                    break
-            else:
-                continue
-            break
 
-    return matching
+async def get_item_details(
+    item: str, vault: str | None = None
+) -> tuple[dict | None, str]:
+    """Get full item details by ID or name. Returns (details, error)."""
+    return await single_flight.run(
+        ("op item get", item, vault), lambda: _get(item, vault)
+    )
 
 
-def get_item_details(item_id: str) -> dict | None:
-    """Get full item details by ID."""
-    success, output = run_op(["item", "get", item_id, "--format", "json"])
+async def _get(item: str, vault: str | None) -> tuple[dict | None, str]:
+    cmd = ["item", "get", item, "--format", "json"]
+    if vault:
+        cmd.extend(["--vault", vault])
+    async with op_slots:
+        success, output = await run_op(cmd)
     if not success:
-        return None
+        return None, output
     try:
-        return json.loads(output)
+        with metrics.span("parse item get"):
+            return json.loads(output), ""
     except json.JSONDecodeError:
+        return None, "Failed to parse 1Password response"
+
+
+async def get_item_creds(item_id: str) -> dict[str, str | None] | None:
+    """Get an item's username/password, from the detail cache when enabled."""
+    creds = detail_cache.get(item_id)
+    if creds is None:
+        creds, _ = await get_credential_item(item_id)
+        if not creds:
+            return None
+        creds = {"username": creds["username"], "password": creds["password"]}
+    username_index.record(item_id, creds["username"], True)
+    return creds
+
+
+async def get_credential_item(
+    item: str, vault: str | None = None
+) -> tuple[dict | None, str]:
+    """Fetch the id, username and password of an item given by ID or name.
+
+    Goes through the broker when one is running. Returns (creds, error).
+    """
+    response = await broker_call({"op": "get", "item": item, "vault": vault})
+    if response is not None:
+        if not response.get("ok"):
+            return None, response.get("error", "Unknown error")
+        creds = response["item"]
+    else:
+        details, error = await get_item_details(item, vault)
+        if details is None:
+            return None, error
+        creds = {"id": details.get("id", item), **extract_credentials(details)}
+    detail_cache.put(creds["id"], creds)
+    return creds, ""
+
+
+async def fetch_candidates(
+    items: list[dict],
+    username_filter: str = "",
+    fetched: dict[str, dict] | None = None,
+) -> tuple[dict | None, list[dict]]:
+    """Fetch details for every item concurrently (bounded by MAX_CONCURRENCY).
+
+    Returns (exact_match, candidates). When username_filter matches an item's
+    username exactly, the remaining fetches are cancelled and that item is
+    returned as exact_match. Candidates keep the listing order. Candidates
+    already in `fetched` (by item id) are reused rather than fetched again.
+    """
+    fetched = dict(fetched or {})
+    tasks = {
+        asyncio.create_task(get_item_creds(item["id"])): item
+        for item in items
+        if item["id"] not in fetched
+    }
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                creds = task.result()
+                if not creds:
+                    continue
+                item = tasks[task]
+                candidate = {
+                    "item_name": item.get("title"),
+                    "item_id": item["id"],
+                    **creds,
+                }
+                if (
+                    username_filter
+                    and (candidate["username"] or "").lower() == username_filter
+                ):
+                    return candidate, []
+                fetched[item["id"]] = candidate
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    return None, [fetched[item["id"]] for item in items if item["id"] in fetched]
+
+
+async def resolve_credential(
+    items: list[dict], username_filter: str = ""
+) -> tuple[dict | None, list[dict]]:
+    """Pick the credential for a lookup among its URL matches (see fetch_candidates)."""
+    # The username index usually names the one item to fetch; try its
+    # hits one by one, then fall back to fetching the other matches if stale
+    fetched: dict[str, dict] = {}
+    if username_filter:
+        for item in username_index.matching(items, username_filter):
+            match, candidates = await fetch_candidates([item], username_filter)
+            if match:
+                return match, []
+            fetched.update((c["item_id"], c) for c in candidates)
+    return await fetch_candidates(items, username_filter, fetched)
+
+
+async def find_credentials_batch(
+    entries: list[dict], vault: str | None = None, match: str = "registrable"
+) -> list[dict]:
+    """Resolve many {url, username?} entries with one listing pass.
+
+    Each unique item is fetched at most once, concurrently: first the items the
+    username index names for filtered entries, then every match of entries
+    still unresolved. Results keep the entry order and carry no passwords.
+    """
+    index = await load_index(vault)
+    plans = [
+        (
+            entry.get("url") or "",
+            index.find(entry.get("url") or "", match) if index else [],
+            (entry.get("username") or "").lower(),
+        )
+        for entry in entries
+    ]
+    creds_by_id: dict[str, dict | None] = {}
+
+    async def fetch(ids) -> None:
+        ids = [i for i in dict.fromkeys(ids) if i not in creds_by_id]
+        for item_id, creds in zip(
+            ids, await asyncio.gather(*(get_item_creds(i) for i in ids))
+        ):
+            creds_by_id[item_id] = creds
+
+    def exact(items: list[dict], username: str) -> dict | None:
+        for item in items:
+            creds = creds_by_id.get(item["id"])
+            if creds and (creds["username"] or "").lower() == username:
+                return item
         return None
 
+    await fetch(
+        item["id"]
+        for _, items, username in plans
+        if username
+        for item in username_index.matching(items, username)
+    )
+    await fetch(
+        item["id"]
+        for _, items, username in plans
+        if not (username and exact(items, username))
+        for item in items
+    )
+
+    results = []
+    for url, items, username in plans:
+        found = exact(items, username) if username else None
+        candidates = [
+            {
+                "item_name": item.get("title"),
+                "item_id": item["id"],
+                "username": creds_by_id[item["id"]]["username"],
+            }
+            for item in ([found] if found else items)
+            if creds_by_id.get(item["id"])
+        ]
+        if len(candidates) == 1:
+            results.append({"url": url, "status": "found", **candidates[0]})
+        elif candidates:
+            results.append({"url": url, "status": "multiple", "items": candidates})
+        else:
+            results.append({"url": url, "status": "not_found"})
+    return results
+
 
 @server.list_tools()
 async def list_tools() -> list[Tool]:
@@ -152,7 +1005,7 @@ async def list_tools() -> list[Tool]:
                 "ALWAYS use this tool when logging into a website - pass the domain (e.g., 'github.com', 'twitter.com'). "
                 "Optionally filter by username if you know it. Returns username and copies password to clipboard. "
                 "IMPORTANT: Tell the user to paste the password (Cmd+V / Ctrl+V) - it's already in their clipboard. "
-                "Returns list of available accounts if multiple matches. Handles domain aliases (x.com/twitter.com)."
+                "Returns list of available accounts if multiple matches. Matches any subdomain of the same site and handles domain aliases (x.com/twitter.com)."
             ),
             inputSchema={
                 "type": "object",
@@ -169,6 +1022,15 @@ async def list_tools() -> list[Tool]:
                         "type": "string",
                         "description": "Optional vault name or ID",
                     },
+                    "match": {
+                        "type": "string",
+                        "enum": list(MATCH_MODES),
+                        "description": (
+                            "How to match item URLs: 'registrable' (default) = anything under the same site "
+                            "(e.g. accounts.google.com also finds mail.google.com), "
+                            "'domain' = host and its subdomains, 'exact' = this host only"
+                        ),
+                    },
                 },
                 "required": ["url"],
             },
@@ -187,10 +1049,73 @@ async def list_tools() -> list[Tool]:
                         "type": "string",
                         "description": "Optional vault name or ID",
                     },
+                    "match": {
+                        "type": "string",
+                        "enum": list(MATCH_MODES),
+                        "description": (
+                            "How to match item URLs: 'registrable' (default) = anything under the same site "
+                            "(e.g. accounts.google.com also finds mail.google.com), "
+                            "'domain' = host and its subdomains, 'exact' = this host only"
+                        ),
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": LIST_PAGE_MAX,
+                        "description": f"Items per page (default {LIST_PAGE_SIZE})",
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "next_cursor from the previous page, to fetch the next one",
+                    },
+                    "compact": {
+                        "type": "boolean",
+                        "description": (
+                            "Skip fetching item details and take usernames from the item listing "
+                            "(much faster on broad domains; may be stale or missing for non-login items)"
+                        ),
+                    },
                 },
                 "required": ["url"],
             },
         ),
+        Tool(
+            name="find_credentials",
+            description=(
+                "Batch version of find_credential for flows that need several sites at once "
+                "(e.g. onboarding). Resolves every {url, username?} entry with a single vault listing. "
+                "Does NOT copy any password: returns usernames plus a 'clipboard_queue' of item IDs in "
+                "entry order. Call get_credential(item_name=<item_id>) for each queued item right before "
+                "filling that site's password field."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "entries": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "url": {"type": "string"},
+                                "username": {"type": "string"},
+                            },
+                            "required": ["url"],
+                        },
+                        "description": "Sites to resolve, each with an optional username filter",
+                    },
+                    "vault": {
+                        "type": "string",
+                        "description": "Optional vault name or ID",
+                    },
+                    "match": {
+                        "type": "string",
+                        "enum": list(MATCH_MODES),
+                        "description": "Same as find_credential",
+                    },
+                },
+                "required": ["entries"],
+            },
+        ),
         Tool(
             name="get_credential",
             description=(
@@ -214,16 +1139,50 @@ async def list_tools() -> list[Tool]:
                 "required": ["item_name"],
             },
         ),
+        Tool(
+            name="refresh_cache",
+            description=(
+                "Fetch the 1Password item listing again and patch the cached index with what changed. "
+                "Use after adding or editing items in 1Password so lookups see the change."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "vault": {
+                        "type": "string",
+                        "description": "Optional vault name or ID (default: every cached vault)",
+                    },
+                },
+            },
+        ),
+        Tool(
+            name="server_stats",
+            description=(
+                "Show latency percentiles (p50/p95/p99, milliseconds) per tool and per phase "
+                "(op item list/get, JSON parsing, indexing, clipboard), op calls per request "
+                "and cache hit ratios. Use to diagnose slow lookups."
+            ),
+            inputSchema={"type": "object", "properties": {}},
+        ),
+        Tool(
+            name="cache_status",
+            description=(
+                "Show item listing cache statistics (hits, misses, cached vaults and their age), "
+                "how many concurrent duplicate lookups were coalesced, and startup warm-up progress."
+            ),
+            inputSchema={"type": "object", "properties": {}},
+        ),
     ]
 
 
-def format_credential_response(creds: dict) -> dict:
+async def format_credential_response(creds: dict) -> dict:
     """Format credential response, copying password to clipboard instead of returning it."""
     password = creds.get("password")
     response = {"username": creds.get("username")}
 
     if password:
-        success, message = copy_to_clipboard(password)
+        with metrics.span("clipboard"):
+            success, message = await copy_to_clipboard(password)
         if success:
             response["password"] = (
                 "[COPIED TO CLIPBOARD - User can paste with Cmd+V / Ctrl+V]"
@@ -236,23 +1195,104 @@ def format_credential_response(creds: dict) -> dict:
     return response
 
 
+def cache_hit_ratios() -> dict:
+    detail = detail_cache.hits + detail_cache.misses
+    return {
+        "listing": listing_cache.stats()["hit_ratio"],
+        "detail": round(detail_cache.hits / detail, 3) if detail else None,
+        "negative_hits": negative_cache.hits,
+        "coalesced": sum(single_flight.hits.values()),
+    }
+
+
+async def server_stats() -> dict:
+    """Latency percentiles, op calls per request and cache hit ratios."""
+    stats = {
+        **metrics.stats(),
+        "cache_hit_ratio": cache_hit_ratios(),
+        "clipboard": clipboard.stats(),
+    }
+    # Lookups routed through a broker run their op calls there
+    response = await broker_call({"op": "stats"})
+    if response is not None and response.get("ok"):
+        stats["broker"] = response["stats"]
+    return stats
+
+
+async def refresh_listings(vault: str | None = None) -> dict:
+    """Refetch one vault (or every cached vault) and report each delta."""
+    # A broker holds the shared listing; refresh it there first
+    await broker_call({"op": "refresh", "vault": vault})
+    keys = [vault] if vault else list(listing_cache.entries) or [None]
+    refreshed = {}
+    for key in keys:
+        index = await load_index(key, refresh=True)
+        refreshed[key or "(all)"] = (
+            {"items": len(index.items), **index.last_delta}
+            if index is not None
+            else "error: listing failed"
+        )
+    return refreshed
+
+
+# Lookup tools whose identical concurrent calls share one execution
+COALESCED_TOOLS = ("find_credential", "list_items_for_url")
+
+# list_items_for_url page size: default and upper bound
+LIST_PAGE_SIZE = 20
+LIST_PAGE_MAX = 100
+
+
+def encode_cursor(host: str, match: str, offset: int) -> str:
+    """Opaque list_items_for_url cursor, tied to the lookup it came from."""
+    raw = json.dumps({"host": host, "match": match, "offset": offset})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, host: str, match: str) -> int | None:
+    """Offset encoded in a cursor, or None if invalid or from another lookup."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if data["host"] == host and data["match"] == match:
+            return max(0, int(data["offset"]))
+    except (ValueError, TypeError, KeyError):
+        pass
+    return None
+
+
 @server.call_tool()
 async def call_tool(name: str, arguments: dict) -> list[TextContent]:
+    with metrics.request(name):
+        if name in COALESCED_TOOLS:
+            key = (
+                name,
+                arguments.get("vault"),
+                normalize_domain(arguments.get("url") or ""),
+                (arguments.get("username") or "").lower(),
+                arguments.get("match", "registrable"),
+                arguments.get("limit"),
+                arguments.get("cursor"),
+                bool(arguments.get("compact")),
+            )
+            return await single_flight.run(key, lambda: handle_tool(name, arguments))
+        return await handle_tool(name, arguments)
+
+
+async def handle_tool(name: str, arguments: dict) -> list[TextContent]:
     if name == "get_credential":
         item_name = arguments.get("item_name")
         if not item_name:
             return [TextContent(type="text", text="Error: item_name is required")]
-        cmd = ["item", "get", item_name, "--format", "json"]
-        if vault := arguments.get("vault"):
-            cmd.extend(["--vault", vault])
-        success, output = run_op(cmd)
-        if not success:
-            return [TextContent(type="text", text=f"Error: {output}")]
-        creds = extract_creds(output)
-        if "error" in creds:
-            return [TextContent(type="text", text=f"Error: {creds['error']}")]
+        vault = arguments.get("vault")
+        creds = None if vault else detail_cache.get(item_name)
+        if creds is None:
+            creds, error = await get_credential_item(item_name, vault)
+            if creds is None:
+                return [TextContent(type="text", text=f"Error: {error}")]
         return [
-            TextContent(type="text", text=json.dumps(format_credential_response(creds)))
+            TextContent(
+                type="text", text=json.dumps(await format_credential_response(creds))
+            )
         ]
 
     elif name == "find_credential":
@@ -262,38 +1302,28 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         username_filter = arguments.get("username", "").lower()
         vault = arguments.get("vault")
 
-        items = find_items_by_url(url, vault)
+        items = await find_items_by_url(
+            url, vault, arguments.get("match", "registrable")
+        )
         if not items:
             return [TextContent(type="text", text=f"No items found for URL: {url}")]
 
-        # Get full details for each item and filter by username if specified
-        candidates = []
-        for item in items:
-            details = get_item_details(item["id"])
-            if not details:
-                continue
-            creds = extract_creds_from_item(details)
-            item_username = (creds.get("username") or "").lower()
-
-            if username_filter:
-                if username_filter == item_username:
-                    # Exact match - return immediately
-                    formatted = format_credential_response(creds)
-                    return [
-                        TextContent(
-                            type="text",
-                            text=json.dumps(
-                                {
-                                    "item_name": item.get("title"),
-                                    "item_id": item["id"],
-                                    **formatted,
-                                }
-                            ),
-                        )
-                    ]
-            candidates.append(
-                {"item_name": item.get("title"), "item_id": item["id"], **creds}
-            )
+        match, candidates = await resolve_credential(items, username_filter)
+        if match:
+            # Exact match - remaining fetches were cancelled
+            formatted = await format_credential_response(match)
+            return [
+                TextContent(
+                    type="text",
+                    text=json.dumps(
+                        {
+                            "item_name": match["item_name"],
+                            "item_id": match["item_id"],
+                            **formatted,
+                        }
+                    ),
+                )
+            ]
 
         if not candidates:
             return [
@@ -305,7 +1335,7 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
             ]
 
         if len(candidates) == 1:
-            formatted = format_credential_response(candidates[0])
+            formatted = await format_credential_response(candidates[0])
             return [
                 TextContent(
                     type="text",
@@ -340,38 +1370,267 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         if not url:
             return [TextContent(type="text", text="Error: url is required")]
         vault = arguments.get("vault")
+        match = arguments.get("match", "registrable")
+        host = normalize_domain(url)
+
+        offset = 0
+        if arguments.get("cursor"):
+            offset = decode_cursor(arguments["cursor"], host, match)
+            if offset is None:
+                return [
+                    TextContent(
+                        type="text", text="Error: cursor is invalid for this URL"
+                    )
+                ]
+        try:
+            limit = int(arguments.get("limit") or LIST_PAGE_SIZE)
+        except (TypeError, ValueError):
+            return [TextContent(type="text", text="Error: limit must be an integer")]
+        limit = min(max(limit, 1), LIST_PAGE_MAX)
 
-        items = find_items_by_url(url, vault)
+        items = await find_items_by_url(url, vault, match)
         if not items:
             return [TextContent(type="text", text=f"No items found for URL: {url}")]
+        page = items[offset : offset + limit]
 
-        # Get usernames for each item
-        result = []
-        for item in items:
-            details = get_item_details(item["id"])
-            username = None
-            if details:
-                creds = extract_creds_from_item(details)
-                username = creds.get("username")
-            result.append(
+        if arguments.get("compact"):
+            # The listing carries the username of Login items; no item is fetched
+            usernames = [
+                item.get("additional_information") or None
+                if item.get("category") == "LOGIN"
+                else None
+                for item in page
+            ]
+        else:
+            # Get usernames for the page only, fetching details concurrently
+            all_creds = await asyncio.gather(
+                *(get_item_creds(item["id"]) for item in page)
+            )
+            usernames = [
+                creds.get("username") if creds else None for creds in all_creds
+            ]
+        result = {
+            "items": [
                 {
                     "item_name": item.get("title"),
                     "item_id": item["id"],
                     "username": username,
                 }
-            )
+                for item, username in zip(page, usernames)
+            ],
+            "total": len(items),
+            "next_cursor": (
+                encode_cursor(host, match, offset + limit)
+                if offset + limit < len(items)
+                else None
+            ),
+        }
 
         return [TextContent(type="text", text=json.dumps(result))]
 
+    elif name == "find_credentials":
+        entries = arguments.get("entries")
+        if not entries:
+            return [TextContent(type="text", text="Error: entries is required")]
+        results = await find_credentials_batch(
+            entries, arguments.get("vault"), arguments.get("match", "registrable")
+        )
+        queue = [r["item_id"] for r in results if r["status"] == "found"]
+        return [
+            TextContent(
+                type="text",
+                text=json.dumps(
+                    {
+                        "results": results,
+                        "clipboard_queue": queue,
+                        "message": (
+                            "No password was copied. For each item in clipboard_queue, in order, "
+                            "call get_credential(item_name=<item_id>) right before filling its password."
+                        ),
+                    }
+                ),
+            )
+        ]
+
+    elif name == "refresh_cache":
+        refreshed = await refresh_listings(arguments.get("vault"))
+        return [TextContent(type="text", text=json.dumps({"refreshed": refreshed}))]
+
+    elif name == "cache_status":
+        stats = {
+            **listing_cache.stats(),
+            "coalesced": single_flight.hits,
+            "detail_cache": detail_cache.stats(),
+            "negative_cache": negative_cache.stats(),
+            "warmup": warmup_status,
+        }
+        return [TextContent(type="text", text=json.dumps(stats))]
+
+    elif name == "server_stats":
+        return [TextContent(type="text", text=json.dumps(await server_stats()))]
+
     return [TextContent(type="text", text=f"Unknown tool: {name}")]
 
 
+# Vaults to prefetch at startup (comma-separated; empty = the default all-vault listing)
+WARMUP_VAULTS = [
+    v.strip() or None for v in os.environ.get("OP_MCP_VAULTS", "").split(",")
+]
+WARMUP_ENABLED = os.environ.get("OP_MCP_WARMUP", "1") != "0"
+
+warmup_status: dict = {"state": "disabled" if not WARMUP_ENABLED else "pending"}
+
+
+async def warm_up() -> None:
+    """Seed the listing cache from the snapshot, then prefetch every vault.
+
+    Runs as a task once the server is accepting requests, so neither step
+    delays the MCP handshake. Vaults seeded from the snapshot keep serving
+    lookups while a fresh listing revalidates them; others are loaded and
+    tool calls arriving meanwhile join the in-flight listing instead of
+    starting their own. With OP_MCP_WARMUP=0 only the snapshot is loaded.
+    """
+    snapshot_vaults = await load_snapshot()
+    if not WARMUP_ENABLED:
+        return
+    started = time.monotonic()
+    vaults: dict[str, int | str] = {}
+    warmup_status.update(state="running", vaults=vaults)
+
+    async def warm(vault: str | None) -> None:
+        vaults[vault or "(all)"] = "loading"
+        index = await load_index(vault, refresh=vault in snapshot_vaults)
+        vaults[vault or "(all)"] = (
+            len(index.items) if index is not None else "error: listing failed"
+        )
+
+    targets = list(dict.fromkeys([*WARMUP_VAULTS, *snapshot_vaults]))
+    await asyncio.gather(*(warm(vault) for vault in targets))
+    failed = any(isinstance(v, str) for v in vaults.values())
+    warmup_status.update(
+        state="failed" if failed else "done",
+        duration_seconds=round(time.monotonic() - started, 3),
+    )
+
+
 async def main():
     async with stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream, write_stream, server.create_initialization_options()
+        # Keep a reference so the task is not garbage collected mid-flight
+        warmup = asyncio.create_task(warm_up())
+        try:
+            await server.run(
+                read_stream, write_stream, server.create_initialization_options()
+            )
+        finally:
+            warmup.cancel()
+            detail_cache.clear()
+            await clipboard.flush()
+            metrics.close()
+
+
+async def broker_dispatch(request: dict) -> dict:
+    """Answer one broker request (protocol documented in broker_client.py)."""
+    op, vault = request.get("op"), request.get("vault")
+    match = request.get("match", "registrable")
+    if op == "ping":
+        return {"ok": True, "pid": os.getpid()}
+    if op == "list":
+        index = await load_index(vault)
+        if index is None:
+            return {"ok": False, "error": "Failed to list items. Run `op signin`."}
+        return {"ok": True, "items": list(index.items.values())}
+    if op == "get":
+        creds, error = await get_credential_item(request.get("item") or "", vault)
+        if not creds:
+            return {"ok": False, "error": error}
+        if request.get("password") is False:
+            # Callers that only need the username never get the password
+            creds = {k: v for k, v in creds.items() if k != "password"}
+        return {"ok": True, "item": creds}
+    if op == "find":
+        items = await find_items_by_url(request.get("url") or "", vault, match)
+        if not items:
+            # Distinct from "no matching credentials": nothing is listed there
+            return {"ok": True, "match": None, "candidates": None}
+        found, candidates = await resolve_credential(
+            items, (request.get("username") or "").lower()
+        )
+        return {"ok": True, "match": found, "candidates": candidates}
+    if op == "batch":
+        results = await find_credentials_batch(
+            request.get("entries") or [], vault, match
         )
+        return {"ok": True, "results": results}
+    if op == "refresh":
+        return {"ok": True, "refreshed": await refresh_listings(vault)}
+    if op == "stats":
+        return {"ok": True, "stats": await server_stats()}
+    return {"ok": False, "error": f"Unknown op: {op}"}
+
+
+async def handle_broker_client(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    try:
+        while line := await reader.readline():
+            try:
+                request = json.loads(line)
+                with metrics.request(f"broker {request.get('op')}"):
+                    response = await broker_dispatch(request)
+            except (json.JSONDecodeError, AttributeError):
+                response = {"ok": False, "error": "Invalid request"}
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+    except (ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def run_broker(path: Path) -> None:
+    """Serve the broker protocol on a Unix socket only this user can open."""
+    global IS_BROKER
+    IS_BROKER = True
+    if path.exists():
+        try:
+            _, writer = await asyncio.open_unix_connection(str(path))
+            writer.close()
+            raise SystemExit(f"A broker is already listening on {path}")
+        except OSError:
+            path.unlink()  # Stale socket from a previous run
+    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    old_umask = os.umask(0o177)
+    try:
+        broker = await asyncio.start_unix_server(
+            handle_broker_client, path=str(path), limit=2**22
+        )
+    finally:
+        os.umask(old_umask)
+    warmup = asyncio.create_task(warm_up())
+    # Shut down cleanly (socket removed, cached passwords wiped) on SIGTERM too
+    asyncio.get_running_loop().add_signal_handler(
+        signal.SIGTERM, asyncio.current_task().cancel
+    )
+    try:
+        async with broker:
+            await broker.serve_forever()
+    finally:
+        warmup.cancel()
+        detail_cache.clear()
+        metrics.close()
+        path.unlink(missing_ok=True)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--broker",
+        action="store_true",
+        help="Run as the shared credential broker instead of an MCP stdio server",
+    )
+    parser.add_argument(
+        "--socket", type=Path, default=SOCKET_PATH, help="Broker socket path"
+    )
+    args = parser.parse_args()
+    with suppress(KeyboardInterrupt, asyncio.CancelledError):
+        asyncio.run(run_broker(args.socket) if args.broker else main())
@@ -6,22 +6,47 @@
 """Find 1Password credential by URL and optionally filter by username.
 
 Usage:
-    ./find_credential.py <url> [username]
+    ./find_credential.py [--vault NAME] <url> [username]
+    ./find_credential.py [--vault NAME] [--jobs 4] --batch [FILE]
 
 Examples:
     ./find_credential.py twitter.com
     ./find_credential.py twitter.com clementwalter
     ./find_credential.py github.com myuser
+    printf 'github.com\nlinear.app me@example.com\n' | ./find_credential.py --batch
+
+--batch reads `url [username]` lines (stdin by default) and prints one JSON
+line per URL as soon as it resolves: {"line", "url", "status", ...} with
+status found, multiple, not_found or error, and line the URL's line number
+in the input (blank and # comment lines count). All lookups share one
+listing.
+
+Without a broker, item metadata from `op item list` is cached on disk for
+OP_MCP_METADATA_TTL seconds (default 600, 0 disables) per account (OP_ACCOUNT)
+and vault, so most runs only call `op item get` for the selected item.
 """
 
+import argparse
+import hashlib
 import json
+import os
 import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+# URL matching and the broker client are shared with the MCP server
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from broker_client import extract_credentials
+from broker_client import request as broker_request
+from domains import DomainIndex
 
-DOMAIN_ALIASES = {
-    "x.com": ["x.com", "twitter.com"],
-    "twitter.com": ["x.com", "twitter.com"],
-}
+CACHE_DIR = (
+    Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "1password-mcp"
+)
+METADATA_TTL = float(os.environ.get("OP_MCP_METADATA_TTL", "600"))
 
 
 def run_op(args: list[str]) -> tuple[bool, str]:
@@ -39,42 +64,97 @@ def run_op(args: list[str]) -> tuple[bool, str]:
         return False, "Timed out - run 'op signin'"
 
 
-def normalize_domain(url: str) -> str:
-    return url.lower().replace("https://", "").replace("http://", "").split("/")[0]
+class MetadataCache:
+    """Listing metadata on disk (0600), one file per account and vault.
 
+    Entries hold ids, titles, categories, hostnames, vault and updated_at.
+    Usernames are only kept as a keyed hash (salt stored with the file) so a
+    username filter can pick the item to fetch; passwords are never stored.
+    """
 
-def extract_creds(item: dict) -> dict:
-    username, password = None, None
-    for f in item.get("fields", []):
-        fid, purpose, val = f.get("id", ""), f.get("purpose", ""), f.get("value")
-        if purpose == "USERNAME" or fid == "username":
-            username = val
-        elif purpose == "PASSWORD" or fid == "password":
-            password = val
-    return {"username": username, "password": password}
+    def __init__(self, vault: str | None):
+        key = f"{os.environ.get('OP_ACCOUNT', '')}\0{vault or ''}"
+        digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+        self.path = CACHE_DIR / "metadata" / f"{digest}.json"
+        self.salt = os.urandom(16)
 
+    def user_hash(self, username: str) -> str:
+        return hashlib.blake2b(
+            username.strip().lower().encode(), key=self.salt, digest_size=16
+        ).hexdigest()
 
-def find_items_by_url(url: str) -> list[dict]:
-    success, output = run_op(["item", "list", "--format", "json"])
-    if not success:
-        return []
+    def load(self) -> DomainIndex | None:
+        """Index of the cached items, or None when missing, expired or disabled.
 
-    try:
-        items = json.loads(output)
-    except json.JSONDecodeError:
-        return []
+        Hosts were normalized when saved, so they are indexed as they are.
+        """
+        if METADATA_TTL <= 0:
+            return None
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if (
+                data.get("version") != 1
+                or time.time() - data["saved_at"] > METADATA_TTL
+            ):
+                return None
+            self.salt = bytes.fromhex(data["salt"])
+            index = DomainIndex([])
+            for e in data["items"]:
+                hosts = e.pop("hosts")
+                index.add({**e, "urls": [{"href": host} for host in hosts]}, hosts)
+            return index
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
 
-    domain = normalize_domain(url)
-    search_domains = DOMAIN_ALIASES.get(domain, [domain])
+    def save(self, index: DomainIndex) -> None:
+        """Write the listing behind `index`, reusing its normalized hosts."""
+        if METADATA_TTL <= 0:
+            return
+        entries = []
+        for item_id, item in index.items.items():
+            username = login_hint(item)
+            entries.append(
+                {
+                    **index.metadata[item_id],
+                    "category": item.get("category"),
+                    "user": self.user_hash(username) if username else None,
+                }
+            )
+        data = {
+            "version": 1,
+            "saved_at": time.time(),
+            "salt": self.salt.hex(),
+            "items": entries,
+        }
+        try:
+            self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(data, handle, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # The cache is an optimisation; lookups still work without it
+
+
+def login_hint(item: dict) -> str | None:
+    """The username `op item list` shows for Login items."""
+    if item.get("category") == "LOGIN":
+        return item.get("additional_information") or None
+    return None
 
-    matching = []
-    for item in items:
-        for url_entry in item.get("urls", []):
-            href = url_entry.get("href", "").lower()
-            if any(sd in href for sd in search_domains):
-                matching.append(item)
-                break
-    return matching
+
+def list_items(vault: str | None) -> list[dict] | None:
+    cmd = ["item", "list", "--format", "json"]
+    if vault:
+        cmd.extend(["--vault", vault])
+    success, output = run_op(cmd)
+    if not success:
+        return None
+    try:
+        return json.loads(output)
+    except json.JSONDecodeError:
+        return None
 
 
 def get_item_details(item_id: str) -> dict | None:
@@ -87,58 +167,209 @@ def get_item_details(item_id: str) -> dict | None:
         return None
 
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: find_credential.py <url> [username]", file=sys.stderr)
-        sys.exit(1)
+class StaleCache(Exception):
+    """A cached item changed or disappeared since it was listed."""
+
 
-    url = sys.argv[1]
-    username_filter = sys.argv[2].lower() if len(sys.argv) > 2 else None
+def resolve(
+    index: DomainIndex,
+    url: str,
+    username_filter: str | None,
+    matches_user,
+    cached: bool,
+):
+    """Returns (match, candidates); (None, None) when no item matches the URL.
 
-    items = find_items_by_url(url)
+    With a username filter only the items whose listed username matches are
+    fetched. When none does, a fresh listing falls back to fetching them all,
+    while a cached one reports a miss: the account may have been added since.
+    Fetched cached items must still carry the cached updated_at, else
+    StaleCache is raised.
+    """
+    items = index.find(url)
     if not items:
-        print(json.dumps({"error": f"No items found for URL: {url}"}))
-        sys.exit(1)
+        return None, None
+    if username_filter:
+        matching = [i for i in items if matches_user(i)]
+        if cached and not matching:
+            return None, None
+        items = matching or items
 
     candidates = []
     for item in items:
         details = get_item_details(item["id"])
+        if cached and (not details or details.get("updated_at") != item["updated_at"]):
+            raise StaleCache(item["id"])
         if not details:
             continue
-        creds = extract_creds(details)
-        item_username = (creds.get("username") or "").lower()
+        creds = extract_credentials(details)
+        candidate = {"item_name": item.get("title"), "item_id": item["id"], **creds}
+        if username_filter and username_filter == (creds["username"] or "").lower():
+            return candidate, []
+        candidates.append(candidate)
+    return None, candidates
 
-        if username_filter and username_filter == item_username:
-            print(
-                json.dumps(
-                    {"item_name": item.get("title"), "item_id": item["id"], **creds}
-                )
-            )
-            sys.exit(0)
 
-        candidates.append(
-            {"item_name": item.get("title"), "item_id": item["id"], **creds}
+class Lookup:
+    """One listing and index per vault, shared by every lookup of a run.
+
+    Starts from the metadata cache and relists (once, for all threads) when
+    a lookup misses or finds a stale item.
+    """
+
+    def __init__(self, vault: str | None):
+        self.vault = vault
+        self.cache = MetadataCache(vault)
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.index: DomainIndex | None = None
+        self.cached = False
+
+    def load(self) -> None:
+        with self.lock:
+            if not self.loaded:
+                self.index = self.cache.load()
+                self.cached = self.index is not None
+                self.loaded = True
+
+    def relist(self) -> None:
+        with self.lock:
+            if self.index is not None and not self.cached:
+                return  # Another lookup already relisted
+            items = list_items(self.vault)
+            if items is None:
+                return
+            self.index, self.cached = DomainIndex(items), False
+            self.cache.save(self.index)
+
+    def find(self, url: str, username_filter: str | None):
+        self.load()
+        if self.cached:
+            try:
+                match, candidates = resolve(
+                    self.index,
+                    url,
+                    username_filter,
+                    lambda i: i.get("user") == self.cache.user_hash(username_filter),
+                    cached=True,
+                )
+                if candidates is not None:
+                    return match, candidates
+            except StaleCache:
+                pass
+            # A miss (no item for the URL or the username) may be an item
+            # added since the cache was written
+        self.relist()
+        if self.index is None or self.cached:
+            return None, None
+        return resolve(
+            self.index,
+            url,
+            username_filter,
+            lambda i: (login_hint(i) or "").lower() == username_filter,
+            cached=False,
         )
 
-    if not candidates:
-        print(json.dumps({"error": "No matching credentials found"}))
-        sys.exit(1)
 
+def find_credential(
+    url: str, username_filter: str | None, vault: str | None, lookup: Lookup
+) -> dict:
+    """Result of one lookup: status found, multiple, not_found or error."""
+    # A running broker answers from its warm caches; otherwise query op directly
+    response = broker_request(
+        {"op": "find", "url": url, "username": username_filter, "vault": vault}
+    )
+    if response is not None:
+        if not response.get("ok"):
+            return {"status": "error", "error": response.get("error", "Broker error")}
+        match, candidates = response.get("match"), response.get("candidates")
+    else:
+        match, candidates = lookup.find(url, username_filter)
+    if match is None and candidates is None:
+        return {"status": "not_found", "error": f"No items found for URL: {url}"}
+
+    if match:
+        return {"status": "found", **match}
+    if not candidates:
+        return {"status": "not_found", "error": "No matching credentials found"}
     if len(candidates) == 1:
-        print(json.dumps(candidates[0]))
+        return {"status": "found", **candidates[0]}
+    return {
+        "status": "multiple",
+        "message": f"Multiple items found for {url}. Specify username to filter.",
+        "items": [
+            {"item_name": c["item_name"], "username": c["username"]} for c in candidates
+        ],
+    }
+
+
+def read_batch(source: str) -> list[tuple[int, str, str | None]]:
+    """(line number, url, username) per `url [username]` line of the input.
+
+    Blank lines and # comments are skipped but still counted, so the numbers
+    match the input file.
+    """
+    if source == "-":
+        lines = [line.split(None, 1) for line in sys.stdin]
     else:
-        print(
-            json.dumps(
-                {
-                    "message": f"Multiple items found for {url}. Specify username to filter.",
-                    "items": [
-                        {"item_name": c["item_name"], "username": c["username"]}
-                        for c in candidates
-                    ],
-                }
-            )
-        )
-        sys.exit(2)
+        try:
+            with open(source, encoding="utf-8") as handle:
+                lines = [line.split(None, 1) for line in handle]
+        except OSError as e:
+            sys.exit(f"Could not read {source}: {e}")
+    return [
+        (n, parts[0], parts[1].strip().lower() if len(parts) > 1 else None)
+        for n, parts in enumerate(lines, 1)
+        if parts and not parts[0].startswith("#")
+    ]
+
+
+def run_batch(entries: list[tuple[int, str, str | None]], vault: str | None, jobs: int):
+    """Print one NDJSON line per entry as soon as it resolves."""
+    lookup = Lookup(vault)
+    failed = False
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(find_credential, url, username, vault, lookup): (n, url)
+            for n, url, username in entries
+        }
+        for future in as_completed(futures):
+            line, url = futures[future]
+            result = future.result()
+            failed = failed or result["status"] != "found"
+            print(json.dumps({"line": line, "url": url, **result}), flush=True)
+    sys.exit(1 if failed else 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("url", nargs="?", help="Website URL or domain")
+    parser.add_argument("username", nargs="?", help="Only this account")
+    parser.add_argument("--vault", help="Only search this vault")
+    parser.add_argument(
+        "--batch",
+        nargs="?",
+        const="-",
+        metavar="FILE",
+        help="Read `url [username]` lines from FILE (default: stdin)",
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=4, help="Concurrent lookups in batch mode"
+    )
+    args = parser.parse_args()
+
+    if args.batch:
+        if args.url:
+            parser.error("--batch takes URLs from its input, not the command line")
+        run_batch(read_batch(args.batch), args.vault, max(1, args.jobs))
+    if not args.url:
+        parser.error("a URL (or --batch) is required")
+
+    username_filter = args.username.lower() if args.username else None
+    result = find_credential(args.url, username_filter, args.vault, Lookup(args.vault))
+    status = result.pop("status")
+    print(json.dumps(result))
+    sys.exit({"found": 0, "multiple": 2}.get(status, 1))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,56 @@
+"""Client for the 1password-mcp credential broker, shared by the server and scripts.
+
+When `1password-mcp/server.py --broker` is running, credentials come from its
+warm `op` session over a Unix socket instead of a fresh `op item get`. Items
+fetched with `op` directly are read with `extract_credentials()`, the same
+field rule as the broker's.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+from pathlib import Path
+
+
+def socket_path() -> Path:
+    """OP_BROKER_SOCKET, else the broker's default under the runtime or cache dir."""
+    if path := os.environ.get("OP_BROKER_SOCKET"):
+        return Path(path).expanduser()
+    base = os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("XDG_CACHE_HOME")
+    return Path(base or Path.home() / ".cache") / "1password-mcp" / "broker.sock"
+
+
+def broker_get(item_name: str) -> dict | None:
+    """Ask a running 1password-mcp credential broker for an item.
+
+    Returns None when no broker is listening, so callers fall back to `op`.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(60)
+            sock.connect(str(socket_path()))
+            sock.sendall(json.dumps({"op": "get", "item": item_name}).encode() + b"\n")
+            response = json.loads(sock.makefile("rb").readline())
+    except (OSError, ValueError):
+        return None
+    return response if response.get("ok") else None
+
+
+def extract_credentials(item: dict) -> dict[str, str | None]:
+    """Username and password of an `op item get` item.
+
+    A field counts by purpose (USERNAME/PASSWORD), id or label, so Login items
+    and custom items such as app passwords are read the same way everywhere;
+    the first match wins.
+    """
+    username, password = None, None
+    for f in item.get("fields", []):
+        fid, purpose, val = f.get("id", ""), f.get("purpose", ""), f.get("value")
+        label = (f.get("label") or "").lower()
+        if purpose == "USERNAME" or "username" in (fid, label):
+            username = username or val
+        elif purpose == "PASSWORD" or "password" in (fid, label):
+            password = password or val
+    return {"username": username, "password": password}
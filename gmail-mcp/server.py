@@ -23,6 +23,7 @@ from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.utils import formatdate
 
+from broker_client import broker_get, extract_credentials
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import TextContent, Tool
@@ -36,13 +37,8 @@ SMTP_HOST = "smtp.gmail.com"
 SMTP_PORT = 465  # SSL port
 
 
-def get_credentials(item_name: str) -> dict:
-    """Get username and password from 1Password item.
-
-    This extracts the actual username field from the 1Password entry,
-    allowing flexible item naming (e.g., "Gmail Work Claude" instead of
-    requiring the item name to match the email address).
-    """
+def op_item_credentials(item_name: str) -> dict:
+    """Read username/password from `op item get` (see extract_credentials)."""
     result = subprocess.run(
         ["op", "item", "get", item_name, "--format", "json"],
         capture_output=True,
@@ -54,16 +50,20 @@ def get_credentials(item_name: str) -> dict:
             f"Failed to get 1Password item '{item_name}': {result.stderr.strip()}"
         )
 
-    item = json.loads(result.stdout)
-    creds = {"username": None, "password": None}
+    return extract_credentials(json.loads(result.stdout))
+
 
-    for field in item.get("fields", []):
-        field_id = field.get("id", "")
-        field_label = field.get("label", "").lower()
-        if field_id == "username" or field_label == "username":
-            creds["username"] = field.get("value")
-        elif field_id == "password" or field_label == "password":
-            creds["password"] = field.get("value")
+def get_credentials(item_name: str) -> dict:
+    """Get username and password from 1Password item.
+
+    This extracts the actual username field from the 1Password entry,
+    allowing flexible item naming (e.g., "Gmail Work Claude" instead of
+    requiring the item name to match the email address).
+    """
+    if response := broker_get(item_name):
+        creds = {k: response["item"].get(k) for k in ("username", "password")}
+    else:
+        creds = op_item_credentials(item_name)
 
     if not creds["username"] or not creds["password"]:
         raise ValueError(
@@ -17,11 +17,20 @@ import email
 import imaplib
 import json
 import subprocess
+import sys
 from email.header import decode_header
+from pathlib import Path
+
+# The broker client is shared with the Gmail MCP server
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from broker_client import broker_get, extract_credentials
 
 
 def get_credentials(item_name: str) -> dict:
     """Get username and password from 1Password item."""
+    if response := broker_get(item_name):
+        return {k: response["item"].get(k) for k in ("username", "password")}
+
     result = subprocess.run(
         ["op", "item", "get", item_name, "--format", "json"],
         capture_output=True,
@@ -30,16 +39,7 @@ def get_credentials(item_name: str) -> dict:
     if result.returncode != 0:
         raise Exception(f"Failed to get 1Password item: {result.stderr}")
 
-    item = json.loads(result.stdout)
-    creds = {"username": None, "password": None}
-
-    for field in item.get("fields", []):
-        if field.get("id") == "username" or field.get("label") == "username":
-            creds["username"] = field.get("value")
-        elif field.get("id") == "password" or field.get("label") == "password":
-            creds["password"] = field.get("value")
-
-    return creds
+    return extract_credentials(json.loads(result.stdout))
 
 
 def list_emails(item_name: str, limit: int = 20, folder: str = "INBOX"):